@@ -1,7 +0,0 @@
-from emulator import (
-    Emulator,
-)
-
-from view import (
-    Frame,
-)
@@ -1,5 +1,8 @@
+import array
+import cache
 import ply.lex as lex
 import ply.yacc as yacc
+import sys
 
 # Constants
 SIZE = 0x10000
@@ -138,6 +141,7 @@ class Program(object):
         return '\n'.join(lines)
 
 class Data(object):
+    __slots__ = ['data', 'size', 'offset', 'conditional']
     def __init__(self, data):
         self.data = data
         self.size = len(data)
@@ -151,6 +155,7 @@ class Data(object):
         return 'DAT %s' % data
 
 class Reserve(object):
+    __slots__ = ['size', 'offset', 'conditional']
     def __init__(self, size):
         self.size = size
         self.offset = None
@@ -161,6 +166,7 @@ class Reserve(object):
         return 'RESERVE %s' % pretty_value(self.size)
 
 class Label(object):
+    __slots__ = ['name', 'size', 'offset', 'conditional']
     def __init__(self, name, offset=None):
         self.name = name
         self.size = 0
@@ -172,6 +178,7 @@ class Label(object):
         return ':%s' % self.name
 
 class BasicInstruction(object):
+    __slots__ = ['op', 'dst', 'src', 'value', 'size', 'offset', 'conditional']
     def __init__(self, op, dst, src):
         self.op = op
         self.dst = dst
@@ -195,6 +202,7 @@ class BasicInstruction(object):
         return '%s %s, %s' % (op, dst, src)
 
 class SpecialInstruction(object):
+    __slots__ = ['op', 'src', 'value', 'size', 'offset', 'conditional']
     def __init__(self, op, src):
         self.op = op
         self.src = src
@@ -215,6 +223,7 @@ class SpecialInstruction(object):
         return '%s %s' % (op, src)
 
 class CommandInstruction(object):
+    __slots__ = ['value', 'size', 'offset', 'conditional']
     def __init__(self, value):
         self.value = value
         self.size = 1
@@ -227,6 +236,7 @@ class CommandInstruction(object):
         return REV_COMMAND_OPCODES[self.value]
 
 class Operand(object):
+    __slots__ = ['codes', 'value', 'word', 'size']
     def __init__(self, codes, value, word=None):
         self.codes = codes
         self.value = value
@@ -259,10 +269,12 @@ class Operand(object):
             return pretty_value(x - 0x21)
 
 class DstOperand(Operand):
+    __slots__ = []
     def __init__(self, *args):
         super(DstOperand, self).__init__(REV_DST_CODES, *args)
 
 class SrcOperand(Operand):
+    __slots__ = []
     def __init__(self, *args):
         super(SrcOperand, self).__init__(REV_SRC_CODES, *args)
 
@@ -362,22 +374,25 @@ def p_program(t):
     t[0] = Program(t[1])
 
 def p_instructions1(t):
-    'instructions : instruction instructions'
-    t[0] = (t[1],) + t[2]
+    'instructions : instructions instruction'
+    t[0] = t[1]
+    t[0].append(t[2])
 
 def p_instructions2(t):
     'instructions : instruction'
-    t[0] = (t[1],)
+    t[0] = [t[1]]
 
 def p_data1(t):
-    'data : literal data'
-    arg = t[1] if isinstance(t[1], tuple) else (t[1],)
-    t[0] = arg + t[2]
+    'data : data literal'
+    t[0] = t[1]
+    if isinstance(t[2], tuple):
+        t[0].extend(t[2])
+    else:
+        t[0].append(t[2])
 
 def p_data2(t):
     'data : literal'
-    arg = t[1] if isinstance(t[1], tuple) else (t[1],)
-    t[0] = arg
+    t[0] = list(t[1]) if isinstance(t[1], tuple) else [t[1]]
 
 def p_instruction_data(t):
     'instruction : DAT data'
@@ -552,20 +567,33 @@ def p_error(t):
 
 # Assembler Functions
 def create_lexer():
-    lexer = lex.lex()
+    lexer = cache.create_lexer(lex, sys.modules[__name__], 'assembler')
     lexer.label_prefix = None
     return lexer
 
 def create_parser():
-    parser = yacc.yacc(debug=False, write_tables=False)
+    parser = cache.create_parser(yacc, sys.modules[__name__], 'assembler')
     return parser
 
-LEXER = create_lexer()
-PARSER = create_parser()
+LEXER = None
+PARSER = None
+
+def get_lexer():
+    global LEXER
+    if LEXER is None:
+        LEXER = create_lexer()
+    return LEXER
+
+def get_parser():
+    global PARSER
+    if PARSER is None:
+        PARSER = create_parser()
+    return PARSER
 
 def parse(text):
-    LEXER.lineno = 1
-    program = PARSER.parse(text, lexer=LEXER)
+    lexer = get_lexer()
+    lexer.lineno = 1
+    program = get_parser().parse(text, lexer=lexer)
     program.text = text
     return program
 
@@ -623,8 +651,20 @@ def disassemble(words):
     program.text = program.pretty()
     return program
 
+def words_from_bytes(data):
+    words = array.array('H')
+    words.fromstring(data[:len(data) & ~1])
+    if sys.byteorder == 'little':
+        words.byteswap()
+    return words
+
+def bytes_from_words(words):
+    words = array.array('H', words)
+    if sys.byteorder == 'little':
+        words.byteswap()
+    return words.tostring()
+
 def disassemble_file(path):
     with open(path, 'rb') as fp:
         data = fp.read()
-    words = [(ord(a) << 8) | ord(b) for a, b in zip(data[::2], data[1::2])]
-    return disassemble(words)
+    return disassemble(list(words_from_bytes(data)))
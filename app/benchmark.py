@@ -1,11 +1,29 @@
 import assembler
+import build
 import emulator
+import os
+import preprocessor
+import subprocess
+import sys
 import time
 
-def benchmark(name, module, program):
+# Constants
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+STARTUP_MODULES = [
+    'app',
+    'app.emulator',
+    'app.preprocessor',
+    'app.assembler',
+    'app.build',
+    'app.run',
+]
+STARTUP_RUNS = 5
+SCALING_LINES = [1000, 10000, 100000]
+
+def benchmark(name, module, program, engine=emulator.REFERENCE):
     print 'Benchmarking "%s" emulator using "%s"...' % (name, program)
-    emu = module.Emulator()
-    emu.load(assembler.assemble_file(program))
+    emu = module.Emulator(engine)
+    emu.load(build.build_file(program).words)
     duration = 10
     cycles = 0
     batch = 100000
@@ -20,6 +38,49 @@ def benchmark(name, module, program):
     print 'Result: %d cycles per second' % cycles_per_second
     print
 
+def time_import(module):
+    start = time.time()
+    subprocess.check_call([sys.executable, '-c', 'import %s' % module],
+        cwd=ROOT)
+    return time.time() - start
+
+def benchmark_startup():
+    print 'Benchmarking startup (best of %d)...' % STARTUP_RUNS
+    baseline = min(time_import('sys') for i in xrange(STARTUP_RUNS))
+    for module in STARTUP_MODULES:
+        best = min(time_import(module) for i in xrange(STARTUP_RUNS))
+        print '%-20s %6.1f ms' % (module, (best - baseline) * 1000)
+    print
+
+def generate_source(lines):
+    result = []
+    for index in xrange(lines / 4):
+        result.append(':label%d SET A, [0x1000 + I]' % index)
+        result.append('ADD A, label%d' % index)
+        result.append('IFN A, 0x20')
+        result.append('DAT 1, 2, "abc", label%d' % index)
+    return '\n'.join(result)
+
+def benchmark_scaling():
+    print 'Benchmarking assembler scaling...'
+    for lines in SCALING_LINES:
+        text = generate_source(lines)
+        start = time.time()
+        program = assembler.parse(preprocessor.preprocess(text))
+        program.assemble()
+        elapsed = time.time() - start
+        print '%7d lines %8.3f s %6.1f us per line' % (
+            lines, elapsed, elapsed * 1e6 / lines)
+    print
+
 if __name__ == '__main__':
-    program = 'programs/life.dasm'
+    if sys.argv[1:] == ['--startup']:
+        benchmark_startup()
+        sys.exit(0)
+    if sys.argv[1:] == ['--scaling']:
+        benchmark_scaling()
+        sys.exit(0)
+    program = sys.argv[1] if len(sys.argv) > 1 else 'programs/life.dasm'
     benchmark('C', emulator, program)
+    benchmark('C (threaded)', emulator, program, emulator.THREADED)
+    benchmark('C (translated)', emulator, program, emulator.TRANSLATED)
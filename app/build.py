@@ -0,0 +1,35 @@
+from array import array
+import assembler
+import cache
+import cPickle as pickle
+import hashlib
+import preprocessor
+
+# Constants
+CACHE_SIZE = 64 * 1024 * 1024
+
+def source_key(text):
+    digest = hashlib.sha1()
+    digest.update(cache.toolchain_key(assembler, cache))
+    digest.update(text)
+    return digest.hexdigest()
+
+def build(text):
+    text = preprocessor.preprocess(text)
+    key = source_key(text)
+    data = cache.load_entry('build', key)
+    if data is not None:
+        try:
+            return pickle.loads(data)
+        except Exception:
+            cache.remove_entry('build', key)
+    program = assembler.parse(text)
+    program.words = array('H', program.assemble())
+    data = pickle.dumps(program, pickle.HIGHEST_PROTOCOL)
+    cache.store_entry('build', key, data, CACHE_SIZE)
+    return program
+
+def build_file(path):
+    with open(path) as fp:
+        text = fp.read()
+    return build(text)
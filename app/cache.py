@@ -0,0 +1,231 @@
+import cPickle as pickle
+import glob
+import hashlib
+import os
+import sys
+import tempfile
+import types
+
+# Constants
+VERSION = 1
+NAME = 'dcpu16'
+GRAMMAR_NAMES = set(['tokens', 'literals', 'precedence', 'start', 'states'])
+
+# Cache Directory
+def cache_root():
+    path = os.environ.get('DCPU16_CACHE')
+    if path is not None:
+        return path or None
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+            os.path.expanduser('~'), '.cache')
+    return os.path.join(base, NAME)
+
+def cache_dir(*names):
+    root = cache_root()
+    if root is None:
+        return None
+    path = os.path.join(root, 'v%d' % VERSION, *names)
+    if not os.path.isdir(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            return None
+    return path
+
+def temp_file(folder, suffix=''):
+    try:
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=folder)
+    except (IOError, OSError):
+        return None
+    os.close(fd)
+    return path
+
+def open_temp(folder):
+    try:
+        fd, path = tempfile.mkstemp(dir=folder)
+    except (IOError, OSError):
+        return None, None
+    return os.fdopen(fd, 'wb'), path
+
+def replace_file(src, dst):
+    try:
+        if sys.platform == 'win32' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+        return True
+    except OSError:
+        remove_file(src)
+        return False
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def remove_stale(folder, pattern, path):
+    for name in glob.glob(os.path.join(folder, pattern)):
+        if name != path:
+            remove_file(name)
+
+# Entries
+def load_entry(kind, key):
+    folder = cache_dir(kind)
+    if folder is None:
+        return None
+    path = os.path.join(folder, key)
+    try:
+        with open(path, 'rb') as fp:
+            data = fp.read()
+        os.utime(path, None)
+    except (IOError, OSError):
+        return None
+    return data
+
+def store_entry(kind, key, data, limit):
+    folder = cache_dir(kind)
+    if folder is None:
+        return False
+    fp, temp = open_temp(folder)
+    if fp is None:
+        return False
+    try:
+        with fp:
+            fp.write(data)
+    except IOError:
+        remove_file(temp)
+        return False
+    result = replace_file(temp, os.path.join(folder, key))
+    evict(folder, limit)
+    return result
+
+def remove_entry(kind, key):
+    folder = cache_dir(kind)
+    if folder is not None:
+        remove_file(os.path.join(folder, key))
+
+def evict(folder, limit):
+    entries = []
+    for name in os.listdir(folder):
+        if name.startswith(tempfile.template):
+            continue
+        path = os.path.join(folder, name)
+        try:
+            info = os.stat(path)
+        except OSError:
+            continue
+        entries.append((info.st_mtime, info.st_size, path))
+    total = sum(x[1] for x in entries)
+    if total <= limit:
+        return
+    entries.sort()
+    for mtime, size, path in entries:
+        if total <= limit * 3 / 4:
+            break
+        remove_file(path)
+        total -= size
+
+def toolchain_key(*modules):
+    digest = hashlib.sha1()
+    digest.update('%d %r' % (VERSION, sys.version_info[:2]))
+    for module in modules:
+        path = os.path.splitext(module.__file__)[0] + '.py'
+        try:
+            with open(path, 'rb') as fp:
+                data = fp.read()
+        except IOError:
+            data = grammar_key(module)
+        digest.update('%s\0%s\0' % (module.__name__, data))
+    return digest.hexdigest()
+
+# PLY Tables
+def grammar_key(module):
+    import ply.lex
+    digest = hashlib.sha1()
+    digest.update('%d %s %r' % (
+        VERSION, ply.lex.__version__, sys.version_info[:2]))
+    functions = []
+    for name in sorted(dir(module)):
+        if name[:2] not in ('t_', 'p_') and name not in GRAMMAR_NAMES:
+            continue
+        value = getattr(module, name)
+        if isinstance(value, types.FunctionType):
+            functions.append((value.__code__.co_firstlineno, name,
+                value.__doc__))
+        else:
+            digest.update('%s=%r\n' % (name, value))
+    # Rules are ordered by line, but their line numbers don't matter
+    for line, name, doc in sorted(functions):
+        digest.update('%s=%r\n' % (name, doc))
+    return digest.hexdigest()[:16]
+
+def create_lexer(lex, module, name):
+    folder = cache_dir('ply')
+    if folder is None:
+        return lex.lex(module=module)
+    path = os.path.join(folder, '%s-lextab-%s.py' % (
+        name, grammar_key(module)))
+    if os.path.exists(path):
+        try:
+            lextab = types.ModuleType('%s_lextab' % name)
+            with open(path) as fp:
+                exec fp.read() in lextab.__dict__
+            return lex.lex(module=module, optimize=1, lextab=lextab,
+                errorlog=lex.NullLogger())
+        except Exception:
+            pass
+    lexer = lex.lex(module=module)
+    temp = temp_file(folder, '.py')
+    if temp is not None:
+        try:
+            lexer.writetab(os.path.basename(temp)[:-3], folder)
+        except IOError:
+            remove_file(temp)
+        else:
+            if replace_file(temp, path):
+                remove_stale(folder, '%s-lextab-*.py*' % name, path)
+    return lexer
+
+def dump_parser(fp, yacc, module, parser):
+    info = yacc.ParserReflect(dict((x, getattr(module, x))
+        for x in dir(module)), log=yacc.NullLogger())
+    info.get_all()
+    productions = []
+    for p in parser.productions:
+        if p.func:
+            productions.append((p.str, p.name, p.len, p.func,
+                os.path.basename(p.file), p.line))
+        else:
+            productions.append((str(p), p.name, p.len, None, None, None))
+    for value in (yacc.__tabversion__, 'LALR', info.signature(),
+        parser.action, parser.goto, productions):
+        pickle.dump(value, fp, pickle.HIGHEST_PROTOCOL)
+
+def create_parser(yacc, module, name):
+    folder = cache_dir('ply')
+    if folder is None:
+        return yacc.yacc(module=module, debug=False, write_tables=False)
+    path = os.path.join(folder, '%s-parsetab-%s.pickle' % (
+        name, grammar_key(module)))
+    if os.path.exists(path):
+        try:
+            return yacc.yacc(module=module, debug=False,
+                write_tables=False, picklefile=path)
+        except Exception:
+            remove_file(path)
+    parser = yacc.yacc(module=module, debug=False, write_tables=False)
+    fp, temp = open_temp(folder)
+    if fp is None:
+        return parser
+    try:
+        with fp:
+            dump_parser(fp, yacc, module, parser)
+    except (IOError, pickle.PicklingError):
+        remove_file(temp)
+    else:
+        if replace_file(temp, path):
+            remove_stale(folder, '%s-parsetab-*.pickle' % name, path)
+    return parser
@@ -76,7 +76,7 @@ class Editor(stc.StyledTextCtrl):
         position = 0
         text = self.GetLine(line)
         self.StartStyling(self.PositionFromLine(line), 0x1f)
-        lexer = assembler.LEXER
+        lexer = assembler.get_lexer()
         lexer.input(text)
         while True:
             try:
@@ -1,8 +1,112 @@
+from array import array
 from ctypes import *
 import os
+import struct
+import weakref
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 dll = CDLL(os.path.realpath(os.path.join(
     os.path.dirname(__file__), '..', '_emulator')))
+dll.snapshot.restype = c_void_p
+
+# Engines
+REFERENCE = 0
+THREADED = 1
+TRANSLATED = 2
+
+# Stop Reasons
+STOP_BUDGET = 0
+STOP_BRK = 1
+STOP_BREAKPOINT = 2
+STOP_WATCHPOINT = 3
+
+# Watchpoint Access
+WATCH_READ = 1
+WATCH_WRITE = 2
+MAX_WATCHPOINTS = 16
+
+# Call Graph
+FRAME_INTERRUPT = 0x10000
+
+# Devices
+MAX_DEVICES = 16
+N_BUILTIN_DEVICES = 3
+N_EVENTS = MAX_DEVICES + 1
+DEVICE_HANDLER = CFUNCTYPE(None, c_void_p, c_void_p)
+
+# M35FD
+FLOPPY_READ_ONLY = 0
+FLOPPY_READ_WRITE = 1
+FLOPPY_COPY_ON_WRITE = 2
+
+# Mailbox
+MAILBOX_BROADCAST = 0xffff
+DEFAULT_QUANTUM = 1000
+
+# Input Recording
+INPUT_WAIT = 0
+INPUT_KEY_DOWN = 1
+INPUT_KEY_UP = 2
+INPUT_CHAR = 3
+INPUT_MAGIC = 'DCPUIN01'
+INPUT_RECORD = struct.Struct('>IBB')
+
+# LEM
+LEM_WIDTH = 128
+LEM_HEIGHT = 96
+
+class cWatchpoint(Structure):
+    _fields_ = [
+        ('start', c_ushort),
+        ('end', c_ushort),
+        ('access', c_ubyte),
+    ]
+
+class cTraceRecord(Structure):
+    _fields_ = [
+        ('cycle', c_ulonglong),
+        ('dst', c_uint),
+        ('pc', c_ushort),
+        ('word', c_ushort),
+        ('value', c_ushort),
+    ]
+
+if numpy:
+    TRACE_DTYPE = numpy.dtype({
+        'names': [x[0] for x in cTraceRecord._fields_],
+        'formats': ['u8', 'u4', 'u2', 'u2', 'u2'],
+        'offsets': [getattr(cTraceRecord, x[0]).offset
+            for x in cTraceRecord._fields_],
+        'itemsize': sizeof(cTraceRecord),
+    })
+
+# Trace Destinations
+NO_DST = 0xffffffff
+
+class cInputRecord(Structure):
+    _fields_ = [
+        ('cycle', c_ulonglong),
+        ('type', c_ubyte),
+        ('key', c_ubyte),
+    ]
+
+class cDevice(Structure):
+    _fields_ = [
+        ('id', c_uint),
+        ('manufacturer', c_uint),
+        ('version', c_ushort),
+        ('on_hwi', c_void_p),
+        ('on_event', c_void_p),
+        ('on_reset', c_void_p),
+        ('on_save', c_void_p),
+        ('on_restore', c_void_p),
+        ('state', c_void_p),
+        ('save_size', c_uint),
+    ]
 
 class cEmulator(Structure):
     _fields_ = [
@@ -11,28 +115,113 @@ class cEmulator(Structure):
         ('halt', c_ushort),
         ('cycle', c_ulonglong),
         ('interrupt_buffer', c_ushort * 256),
-        ('interrupt_index', c_ushort),
+        ('interrupt_head', c_ushort),
+        ('interrupt_count', c_ushort),
         ('interrupt_queueing', c_ushort),
+        ('interrupt_dropped', c_uint),
         ('lem_screen', c_ushort),
         ('lem_font', c_ushort),
         ('lem_palette', c_ushort),
         ('lem_border', c_ushort),
         ('keyboard_buffer', c_ubyte * 16),
         ('keyboard_pressed', c_ubyte * 256),
-        ('keyboard_index', c_ushort),
+        ('keyboard_head', c_ushort),
+        ('keyboard_count', c_ushort),
         ('keyboard_message', c_ushort),
+        ('keyboard_dropped', c_uint),
         ('clock_cycle', c_ulonglong),
         ('clock_rate', c_ushort),
         ('clock_ticks', c_ushort),
         ('clock_message', c_ushort),
+        ('event_cycle', c_ulonglong),
+        ('events', c_ulonglong * N_EVENTS),
+        ('engine', c_ushort),
+        ('decoded', c_void_p),
+        ('translation', c_void_p),
+        ('dirty', c_ubyte * 128),
+        ('pages', c_void_p),
+        ('breakpoints', c_ubyte * 0x2000),
+        ('watchpoints', cWatchpoint * 16),
+        ('n_breakpoints', c_uint),
+        ('n_watchpoints', c_uint),
+        ('stop', c_ushort),
+        ('stop_address', c_ushort),
+        ('hooks', c_ushort),
+        ('trace', POINTER(cTraceRecord)),
+        ('trace_record', c_void_p),
+        ('trace_capacity', c_uint),
+        ('trace_head', c_uint),
+        ('trace_count', c_uint),
+        ('profile_cycles', POINTER(c_ulonglong)),
+        ('profile_counts', POINTER(c_uint)),
+        ('call_stack', POINTER(c_uint)),
+        ('call_sites', POINTER(c_ushort)),
+        ('call_depth', c_uint),
+        ('samples', POINTER(c_uint)),
+        ('sample_capacity', c_uint),
+        ('sample_size', c_uint),
+        ('samples_dropped', c_uint),
+        ('sample_period', c_uint),
+        ('sample_cycle', c_ulonglong),
+        ('idle_head', c_ushort),
+        ('idle_store', c_ushort),
+        ('idle_wait', c_uint),
+        ('idle_backoff', c_uint),
+        ('devices', cDevice * MAX_DEVICES),
+        ('n_devices', c_uint),
+        ('replay', POINTER(cInputRecord)),
+        ('replay_count', c_uint),
+        ('replay_next', c_uint),
     ]
 
 FIELDS = set(x[0] for x in cEmulator._fields_)
 
+dll.attach_device.argtypes = [POINTER(cEmulator), c_uint, c_uint, c_ushort,
+    c_void_p, c_void_p, c_void_p]
+dll.attach_floppy.restype = c_void_p
+dll.create_cluster.restype = c_void_p
+
+def handler_address(handler):
+    if handler is None or isinstance(handler, (int, long)):
+        return handler
+    return cast(handler, c_void_p).value
+
+class Device(object):
+    id = 0
+    manufacturer = 0
+    version = 0
+    def on_hwi(self, emu):
+        pass
+    def on_event(self, emu):
+        pass
+
+class Floppy(object):
+    def __init__(self, emulator, floppy):
+        self.emulator = emulator
+        self.floppy = floppy
+    def __del__(self):
+        dll.release_floppy(c_void_p(self.floppy))
+    def insert(self, path, mode=FLOPPY_READ_ONLY):
+        if not dll.insert_disk(byref(self.emulator), c_void_p(self.floppy),
+            path, mode):
+            raise IOError('Unable to map disk image: %s' % path)
+    def eject(self):
+        dll.eject_disk(byref(self.emulator), c_void_p(self.floppy))
+
+class Snapshot(object):
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+    def __del__(self):
+        dll.release(c_void_p(self.snapshot))
+
 class Emulator(object):
-    def __init__(self):
+    def __init__(self, engine=REFERENCE):
         self.emulator = cEmulator()
+        self.handlers = []
         self.reset()
+        self.set_engine(engine)
+    def __del__(self):
+        dll.destroy(byref(self.emulator))
     def __getattr__(self, name):
         if name in FIELDS:
             return getattr(self.emulator, name)
@@ -43,25 +232,234 @@ class Emulator(object):
         return super(Emulator, self).__setattr__(name, value)
     def reset(self):
         dll.reset(byref(self.emulator))
+        self.recording = []
+    def set_engine(self, engine):
+        dll.set_engine(byref(self.emulator), engine)
+    def invalidate(self, address=0, length=0x10000):
+        dll.invalidate(byref(self.emulator), address, length)
+    def snapshot(self):
+        snapshot = dll.snapshot(byref(self.emulator))
+        if not snapshot:
+            raise MemoryError('Unable to allocate snapshot.')
+        return Snapshot(snapshot)
+    def restore(self, snapshot):
+        dll.restore(byref(self.emulator), c_void_p(snapshot.snapshot))
+    def take_dirty(self):
+        ranges = (c_uint * 256)()
+        count = dll.take_dirty(byref(self.emulator), ranges)
+        return [(ranges[i * 2], ranges[i * 2 + 1]) for i in xrange(count)]
+    def enable_trace(self, capacity=0x10000):
+        if not dll.enable_trace(byref(self.emulator), capacity):
+            raise MemoryError('Unable to allocate trace buffer.')
+    def disable_trace(self):
+        dll.disable_trace(byref(self.emulator))
+    def clear_trace(self):
+        dll.clear_trace(byref(self.emulator))
+    def trace_buffer(self):
+        capacity = self.emulator.trace_capacity
+        if not capacity:
+            return None
+        address = addressof(self.emulator.trace.contents)
+        data = (cTraceRecord * capacity).from_address(address)
+        if numpy:
+            return numpy.frombuffer(data, dtype=TRACE_DTYPE)
+        return data
+    def trace(self):
+        data = self.trace_buffer()
+        if data is None:
+            return None
+        count = self.emulator.trace_count
+        head = self.emulator.trace_head
+        if count < self.emulator.trace_capacity:
+            return data[:count]
+        if numpy:
+            return numpy.concatenate((data[head:], data[:head]))
+        return data[head:] + data[:head]
+    def enable_profile(self):
+        if not dll.enable_profile(byref(self.emulator)):
+            raise MemoryError('Unable to allocate profile counters.')
+    def disable_profile(self):
+        dll.disable_profile(byref(self.emulator))
+    def clear_profile(self):
+        dll.clear_profile(byref(self.emulator))
+    def profile(self):
+        if not self.emulator.profile_cycles:
+            return None
+        cycles = (c_ulonglong * 0x10000).from_address(
+            addressof(self.emulator.profile_cycles.contents))
+        counts = (c_uint * 0x10000).from_address(
+            addressof(self.emulator.profile_counts.contents))
+        return cycles, counts
+    def enable_call_graph(self, period=1000, capacity=0x100000):
+        if not dll.enable_call_graph(byref(self.emulator), period, capacity):
+            raise MemoryError('Unable to allocate call graph samples.')
+    def disable_call_graph(self):
+        dll.disable_call_graph(byref(self.emulator))
+    def take_samples(self):
+        size = self.emulator.sample_size
+        if not size:
+            return []
+        words = (c_uint * size).from_address(
+            addressof(self.emulator.samples.contents))[:]
+        dll.clear_call_graph(byref(self.emulator))
+        result = []
+        index = 0
+        while index < size:
+            depth = words[index]
+            result.append(tuple(words[index + 1:index + depth + 3]))
+            index += depth + 3
+        return result
+    def ram_view(self):
+        if numpy:
+            return numpy.frombuffer(self.emulator.ram, dtype=numpy.uint16)
+        return self.emulator.ram
+    def render_screen(self, rgb=True):
+        depth = 3 if rgb else 1
+        data = create_string_buffer(LEM_WIDTH * LEM_HEIGHT * depth)
+        border = dll.render_lem(byref(self.emulator), data, int(rgb))
+        if numpy:
+            pixels = numpy.frombuffer(data, dtype=numpy.uint8)
+            shape = (LEM_HEIGHT, LEM_WIDTH, 3) if rgb else (
+                LEM_HEIGHT, LEM_WIDTH)
+            return pixels.reshape(shape), border
+        return data.raw, border
+    def attach_device(self, id, manufacturer, version, on_hwi=None,
+        on_event=None, state=None):
+        index = dll.attach_device(byref(self.emulator), id, manufacturer,
+            version, handler_address(on_hwi), handler_address(on_event),
+            state)
+        if index < 0:
+            raise ValueError('Unable to attach device.')
+        self.handlers.append((on_hwi, on_event, state))
+        return index
+    def attach(self, device):
+        emu = weakref.ref(self)
+        on_hwi = DEVICE_HANDLER(lambda x, y: device.on_hwi(emu()))
+        on_event = DEVICE_HANDLER(lambda x, y: device.on_event(emu()))
+        return self.attach_device(device.id, device.manufacturer,
+            device.version, on_hwi, on_event)
+    def attach_floppy(self):
+        floppy = dll.attach_floppy(byref(self.emulator))
+        if not floppy:
+            raise ValueError('Unable to attach device.')
+        floppy = Floppy(self.emulator, floppy)
+        self.handlers.append(floppy)
+        return floppy
+    def detach_devices(self):
+        dll.detach_devices(byref(self.emulator))
+        self.handlers = []
+    def schedule(self, index, cycle):
+        if not 0 <= index < self.emulator.n_devices:
+            raise ValueError('Invalid device index: %d' % index)
+        dll.schedule(byref(self.emulator), index, c_ulonglong(cycle))
+    def interrupt(self, message):
+        dll.interrupt(byref(self.emulator), message)
     def load(self, program):
         self.reset()
-        length = len(program)
-        data = (c_ushort * length)()
-        for index, value in enumerate(program):
-            data[index] = value
-        dll.load(byref(self.emulator), data, length)
-    def load_raw(self, data):
-        words = [(ord(a) << 8) | ord(b) for a, b in zip(data[::2], data[1::2])]
-        self.load(words)
+        if not isinstance(program, array) or program.typecode != 'H':
+            program = array('H', program)
+        address, length = program.buffer_info()
+        dll.load(byref(self.emulator), c_void_p(address), length)
+    def load_raw(self, data, address=0, reset=True):
+        if reset:
+            self.reset()
+        dll.load_bytes(byref(self.emulator), data, len(data), address)
+    def load_file(self, path, address=0, reset=True):
+        with open(path, 'rb') as fp:
+            self.load_raw(fp.read(), address, reset)
+    def dump(self, address=0, length=0x10000):
+        length = min(length, 0x10000 - address)
+        data = create_string_buffer(length * 2)
+        dll.dump_bytes(byref(self.emulator), data, length * 2, address)
+        return data.raw
     def step(self):
         dll.one_step(byref(self.emulator))
     def n_steps(self, steps):
-        dll.n_steps(byref(self.emulator), steps)
+        return dll.n_steps(byref(self.emulator), steps)
     def n_cycles(self, cycles):
-        dll.n_cycles(byref(self.emulator), cycles)
+        return dll.n_cycles(byref(self.emulator), cycles)
+    def set_breakpoint(self, address, enabled=True):
+        dll.set_breakpoint(byref(self.emulator), address, int(enabled))
+    def clear_breakpoints(self):
+        dll.clear_breakpoints(byref(self.emulator))
+    def add_watchpoint(self, start, end=None, access=WATCH_WRITE):
+        end = start if end is None else end
+        index = dll.add_watchpoint(byref(self.emulator), start, end, access)
+        if index < 0:
+            raise ValueError('Unable to add watchpoint.')
+        return index
+    def clear_watchpoints(self):
+        dll.clear_watchpoints(byref(self.emulator))
     def on_key_down(self, key):
+        self.recording.append((self.emulator.cycle, INPUT_KEY_DOWN, key))
         dll.on_key_down(byref(self.emulator), key)
     def on_key_up(self, key):
+        self.recording.append((self.emulator.cycle, INPUT_KEY_UP, key))
         dll.on_key_up(byref(self.emulator), key)
     def on_char(self, key):
+        self.recording.append((self.emulator.cycle, INPUT_CHAR, key))
         dll.on_char(byref(self.emulator), key)
+    def replay(self, records):
+        count = len(records)
+        data = (cInputRecord * count)(*records)
+        if not dll.start_replay(byref(self.emulator), data, count):
+            raise MemoryError('Unable to allocate replay buffer.')
+    def stop_replay(self):
+        dll.stop_replay(byref(self.emulator))
+
+def set_threads(threads):
+    dll.set_threads(threads)
+
+def run_many(emulators, cycles):
+    count = len(emulators)
+    data = (POINTER(cEmulator) * count)()
+    for index, emu in enumerate(emulators):
+        data[index] = pointer(emu.emulator)
+    halted = (c_ubyte * count)()
+    dll.run_many(data, count, cycles, halted)
+    return [bool(x) for x in halted]
+
+def save_inputs(path, records):
+    with open(path, 'wb') as fp:
+        fp.write(INPUT_MAGIC)
+        last = 0
+        for cycle, kind, key in records:
+            delta = cycle - last
+            while delta > 0xffffffff:
+                fp.write(INPUT_RECORD.pack(0xffffffff, INPUT_WAIT, 0))
+                delta -= 0xffffffff
+            fp.write(INPUT_RECORD.pack(delta, kind, key))
+            last = cycle
+
+def load_inputs(path):
+    with open(path, 'rb') as fp:
+        data = fp.read()
+    if data[:len(INPUT_MAGIC)] != INPUT_MAGIC:
+        raise ValueError('Not an input recording: %s' % path)
+    records = []
+    cycle = 0
+    size = INPUT_RECORD.size
+    for offset in xrange(len(INPUT_MAGIC), len(data) - size + 1, size):
+        delta, kind, key = INPUT_RECORD.unpack_from(data, offset)
+        cycle += delta
+        if kind != INPUT_WAIT:
+            records.append((cycle, kind, key))
+    return records
+
+class Cluster(object):
+    def __init__(self, emulators, quantum=DEFAULT_QUANTUM):
+        self.cluster = None
+        self.emulators = list(emulators)
+        count = len(self.emulators)
+        data = (POINTER(cEmulator) * count)()
+        for index, emu in enumerate(self.emulators):
+            data[index] = pointer(emu.emulator)
+        self.cluster = dll.create_cluster(data, count, quantum)
+        if not self.cluster:
+            raise ValueError('Unable to create cluster.')
+    def __del__(self):
+        if self.cluster:
+            dll.release_cluster(c_void_p(self.cluster))
+    def run(self, cycles):
+        dll.run_cluster(c_void_p(self.cluster), cycles)
+        return [bool(emu.halt) for emu in self.emulators]
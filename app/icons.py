@@ -1,7 +1,14 @@
 # Automatically generated file!
-from wx.lib.embeddedimage import PyEmbeddedImage
+DATA = {}
+BITMAPS = {}
 
-basket_put = PyEmbeddedImage(
+def get_bitmap(name):
+    if name not in BITMAPS:
+        from wx.lib.embeddedimage import PyEmbeddedImage
+        BITMAPS[name] = PyEmbeddedImage(DATA[name]).GetBitmap()
+    return BITMAPS[name]
+
+DATA['basket_put'] = (
     "iVBORw0KGgoAAAANSUhEUgAAABAAAAAQCAYAAAAf8/9hAAAABGdBTUEAAK/INwWK6QAAAB"
     "l0RVh0U29mdHdhcmUAQWRvYmUgSW1hZ2VSZWFkeXHJZTwAAAJvSURBVDjLhZNdSJNhFMfP"
     "M9eW+3BjbGIKuik5toZCgYRIF/axEUbSRQUjiqigi7roIiiCrrwIwusKbybtJuquZLSBWc"
@@ -18,7 +25,7 @@ basket_put = PyEmbeddedImage(
     "8r2gCLNuDXjUOnUqn0uPoOav3OW5nf79dwDQaD0k8mKaZoCMdoNAAAAABJRU5ErkJggg=="
 )
 
-control_end = PyEmbeddedImage(
+DATA['control_end'] = (
     "iVBORw0KGgoAAAANSUhEUgAAABAAAAAQCAYAAAAf8/9hAAAABGdBTUEAAK/INwWK6QAAAB"
     "l0RVh0U29mdHdhcmUAQWRvYmUgSW1hZ2VSZWFkeXHJZTwAAAH/SURBVDjLpZPLiupAEIbn"
     "ofJOeQCjoqusJjoLEQVF0I0bRVEXrgSRFnMUQcRbe1m48H6NGi8oKtbpasbIcIY5HE6gSO"
@@ -33,7 +40,7 @@ control_end = PyEmbeddedImage(
     "1+4vP5NI/HozERcblcMvsW/nob/zV+A0hzMNxKeHjMAAAAAElFTkSuQmCC"
 )
 
-control_play = PyEmbeddedImage(
+DATA['control_play'] = (
     "iVBORw0KGgoAAAANSUhEUgAAABAAAAAQCAYAAAAf8/9hAAAABGdBTUEAAK/INwWK6QAAAB"
     "l0RVh0U29mdHdhcmUAQWRvYmUgSW1hZ2VSZWFkeXHJZTwAAAHiSURBVDjLpZPLquJAEIbP"
     "Q+Wd8gAZnTirPIGIgiLoxo2iCxeuBJGgoggq3trLwoX3a9R4QVGxpv/mJCJzOMMwDUVCur"
@@ -48,7 +55,7 @@ control_play = PyEmbeddedImage(
     "dFDAAAAABJRU5ErkJggg=="
 )
 
-control_stop = PyEmbeddedImage(
+DATA['control_stop'] = (
     "iVBORw0KGgoAAAANSUhEUgAAABAAAAAQCAQAAAC1+jfqAAAABGdBTUEAAK/INwWK6QAAAB"
     "l0RVh0U29mdHdhcmUAQWRvYmUgSW1hZ2VSZWFkeXHJZTwAAAElSURBVCjPfZFNSwJBHMb9"
     "UPOd5pR9hUnvIQrFQl26FHXo0CmImEMoQUhl48vBw5qWtY461pKU9PTsrJRsFM9l2N/v/7"
@@ -59,7 +66,7 @@ control_stop = PyEmbeddedImage(
     "htvWXLtqQ3VVn8es2/8gUo3nl2LXz6SAAAAABJRU5ErkJggg=="
 )
 
-disk = PyEmbeddedImage(
+DATA['disk'] = (
     "iVBORw0KGgoAAAANSUhEUgAAABAAAAAQCAYAAAAf8/9hAAAABGdBTUEAAK/INwWK6QAAAB"
     "l0RVh0U29mdHdhcmUAQWRvYmUgSW1hZ2VSZWFkeXHJZTwAAAH+SURBVBgZBcE9i11VGAbQ"
     "tc/sO0OCkqhghEREAwpWAWUg8aMVf4KFaJEqQtAipTZWViKiCGOh2Ap2gmJhlSIWFsFOxU"
@@ -74,7 +81,7 @@ disk = PyEmbeddedImage(
     "IkuSp5gJKElKRISYoUiSRIyD1tufs/IXxui20QsKIAAAAASUVORK5CYII="
 )
 
-folder_page = PyEmbeddedImage(
+DATA['folder_page'] = (
     "iVBORw0KGgoAAAANSUhEUgAAABAAAAAQCAYAAAAf8/9hAAAABGdBTUEAAK/INwWK6QAAAB"
     "l0RVh0U29mdHdhcmUAQWRvYmUgSW1hZ2VSZWFkeXHJZTwAAAJCSURBVBgZBcFBi1VlGADg"
     "5/3Od+/cYWjUTYlRS43Zi1BGuGlVizZB0EJaFf2JNpHgPt1kBf2EXFlEZFFCUJsIsWmhI0"
@@ -91,7 +98,7 @@ folder_page = PyEmbeddedImage(
     "5ErkJggg=="
 )
 
-icon16 = PyEmbeddedImage(
+DATA['icon16'] = (
     "iVBORw0KGgoAAAANSUhEUgAAABAAAAAQCAYAAAAf8/9hAAAAGXRFWHRTb2Z0d2FyZQBBZG"
     "9iZSBJbWFnZVJlYWR5ccllPAAAAkpJREFUeNqEU89PE1EQ/vZHWzEqavSAHpCIB7mCB9CL"
     "BxNvlhpFlBIjYI0nTeDm0aMGTTzYBYoRf0SNqPXiH0Ak0vWiCfWAF8GTpmX9sbupu/t8M+"
@@ -107,7 +114,7 @@ icon16 = PyEmbeddedImage(
     "mO4XyWMH4mTJD/cbbEdZUt1zpsM6G2vwm1n8FWAANyAm/Bgvx4sAAAAASUVORK5CYII="
 )
 
-icon32 = PyEmbeddedImage(
+DATA['icon32'] = (
     "iVBORw0KGgoAAAANSUhEUgAAACAAAAAgCAYAAABzenr0AAAAGXRFWHRTb2Z0d2FyZQBBZG"
     "9iZSBJbWFnZVJlYWR5ccllPAAABS1JREFUeNq0l/tvFFUUx78zs48+dqt9ASWEEKuRQoBE"
     "2pQo+hvKL22gSET7gBS1or9YYkL8A4i/iCiBWAg0tAspRmxV4C9oi2tsTNqGSlIfTTF9WG"
@@ -138,7 +145,7 @@ icon32 = PyEmbeddedImage(
     "CC"
 )
 
-page = PyEmbeddedImage(
+DATA['page'] = (
     "iVBORw0KGgoAAAANSUhEUgAAABAAAAAQCAYAAAAf8/9hAAAABGdBTUEAAK/INwWK6QAAAB"
     "l0RVh0U29mdHdhcmUAQWRvYmUgSW1hZ2VSZWFkeXHJZTwAAAINSURBVBgZBcG/r55zGAfg"
     "6/4+z3va01NHlYgzEfE7MdCIGISFgS4Gk8ViYyM2Mdlsko4GSf8Do0FLRCIkghhYJA3aVB"
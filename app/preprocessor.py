@@ -1,6 +1,8 @@
+import cache
 import ply.lex as lex
 import ply.yacc as yacc
 import re
+import sys
 
 # Classes
 class Program(object):
@@ -54,12 +56,14 @@ class MacroDefinition(object):
         return result
 
 class MacroCall(object):
+    __slots__ = ['line', 'name', 'arguments']
     def __init__(self, line, name, arguments):
         self.line = line
         self.name = name
         self.arguments = arguments
 
 class Token(object):
+    __slots__ = ['line', 'name']
     def __init__(self, line, name):
         self.line = line
         self.name = name
@@ -107,12 +111,13 @@ def p_program(t):
     t[0] = Program(t[1])
 
 def p_items1(t):
-    'items : item items'
-    t[0] = (t[1],) + t[2]
+    'items : items item'
+    t[0] = t[1]
+    t[0].append(t[2])
 
 def p_items2(t):
     'items : item'
-    t[0] = (t[1],)
+    t[0] = [t[1]]
 
 def p_item(t):
     '''item : macro_definition
@@ -177,12 +182,13 @@ def p_argument_token(t):
     t[0] = Token(t.lineno(1), t[1])
 
 def p_tokens1(t):
-    'tokens : token tokens'
-    t[0] = (t[1],) + t[2]
+    'tokens : tokens token'
+    t[0] = t[1]
+    t[0].append(t[2])
 
 def p_tokens2(t):
     'tokens : token'
-    t[0] = (t[1],)
+    t[0] = [t[1]]
 
 def p_token(t):
     '''token : COMMA
@@ -204,15 +210,27 @@ def p_error(t):
 
 # Preprocessor Functions
 def create_lexer():
-    lexer = lex.lex()
+    lexer = cache.create_lexer(lex, sys.modules[__name__], 'preprocessor')
     return lexer
 
 def create_parser():
-    parser = yacc.yacc(debug=False, write_tables=False)
+    parser = cache.create_parser(yacc, sys.modules[__name__], 'preprocessor')
     return parser
 
-LEXER = create_lexer()
-PARSER = create_parser()
+LEXER = None
+PARSER = None
+
+def get_lexer():
+    global LEXER
+    if LEXER is None:
+        LEXER = create_lexer()
+    return LEXER
+
+def get_parser():
+    global PARSER
+    if PARSER is None:
+        PARSER = create_parser()
+    return PARSER
 
 def include_files(text):
     lines = []
@@ -247,9 +265,11 @@ def convert_defines(text):
 def preprocess(text):
     text = convert_defines(text)
     lookup = None
+    lexer = get_lexer()
+    parser = get_parser()
     while True:
-        LEXER.lineno = 1
-        program = PARSER.parse(text)
+        lexer.lineno = 1
+        program = parser.parse(text, lexer=lexer)
         if lookup is None:
             lookup = program.get_lookup()
         count, text = program.preprocess(lookup)
@@ -0,0 +1,127 @@
+import bisect
+import build
+import emulator
+import sys
+
+class Hotspot(object):
+    def __init__(self, label, start, end):
+        self.label = label
+        self.start = start
+        self.end = end
+        self.cycles = 0
+        self.count = 0
+    def percent(self, total):
+        return 100.0 * self.cycles / total if total else 0.0
+
+def by_instruction(program, cycles, counts):
+    result = {}
+    for instruction in program.instructions:
+        if instruction.size:
+            offset = instruction.offset
+            result[offset] = (cycles[offset], counts[offset])
+    return result
+
+def labels(program):
+    names = {}
+    for name, offset in program.lookup.iteritems():
+        names.setdefault(offset, []).append(name)
+    starts = sorted(names)
+    if not starts or starts[0] > 0:
+        starts.insert(0, 0)
+        names.setdefault(0, ['(start)'])
+    return starts, ['/'.join(sorted(names[x])) for x in starts]
+
+def by_label(program, cycles, counts):
+    starts, names = labels(program)
+    hotspots = []
+    for index, start in enumerate(starts):
+        end = starts[index + 1] if index + 1 < len(starts) else program.size
+        hotspots.append(Hotspot(names[index], start, max(start, end)))
+    other = Hotspot('(other)', 0, 0x10000)
+    other.cycles = sum(cycles)
+    other.count = sum(counts)
+    for instruction in program.instructions:
+        if not instruction.size:
+            continue
+        offset = instruction.offset
+        hotspot = hotspots[bisect.bisect_right(starts, offset) - 1]
+        hotspot.cycles += cycles[offset]
+        hotspot.count += counts[offset]
+        other.cycles -= cycles[offset]
+        other.count -= counts[offset]
+    hotspots.append(other)
+    hotspots = [x for x in hotspots if x.count]
+    hotspots.sort(key=lambda x: x.cycles, reverse=True)
+    return hotspots
+
+def symbolizer(program):
+    starts, names = labels(program)
+    def symbolize(address):
+        if address >= program.size:
+            return '%04x' % address
+        return names[bisect.bisect_right(starts, address) - 1]
+    return symbolize
+
+def collapse(program, samples):
+    symbolize = symbolizer(program)
+    stacks = {}
+    for sample in samples:
+        frames = [symbolize(sample[0])]
+        for entry in sample[1:-1]:
+            name = symbolize(entry & 0xffff)
+            if entry & emulator.FRAME_INTERRUPT:
+                name = '[interrupt] %s' % name
+            frames.append(name)
+        leaf = symbolize(sample[-1])
+        if leaf != frames[-1]:
+            frames.append(leaf)
+        key = ';'.join(frames)
+        stacks[key] = stacks.get(key, 0) + 1
+    return stacks
+
+def report(hotspots):
+    total = sum(x.cycles for x in hotspots)
+    lines = ['%-24s %-9s %12s %12s %7s' % (
+        'Label', 'Range', 'Cycles', 'Count', '%')]
+    for hotspot in hotspots:
+        lines.append('%-24s %04x-%04x %12d %12d %7.2f' % (
+            hotspot.label, hotspot.start, max(hotspot.end - 1, hotspot.start),
+            hotspot.cycles, hotspot.count, hotspot.percent(total)))
+    return '\n'.join(lines)
+
+def collapsed(stacks):
+    return '\n'.join('%s %d' % x for x in sorted(stacks.iteritems()))
+
+def profile_file(path, cycles):
+    program = build.build_file(path)
+    emu = emulator.Emulator()
+    emu.load(program.words)
+    emu.enable_profile()
+    emu.n_cycles(cycles)
+    return by_label(program, *emu.profile())
+
+def sample_file(path, cycles, period=1000):
+    program = build.build_file(path)
+    emu = emulator.Emulator()
+    emu.load(program.words)
+    emu.enable_call_graph(period)
+    samples = []
+    while cycles > 0:
+        emu.n_cycles(min(cycles, 1000000))
+        samples.extend(emu.take_samples())
+        cycles -= 1000000
+    return collapse(program, samples)
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    stacks = args[:1] == ['-c']
+    if stacks:
+        args = args[1:]
+    if len(args) not in (1, 2):
+        print 'Usage: python profiler.py [-c] program.dasm [cycles]'
+        sys.exit(1)
+    cycles = int(args[1]) if len(args) == 2 else 1000000
+    if stacks:
+        print collapsed(sample_file(args[0], cycles))
+    else:
+        print report(profile_file(args[0], cycles))
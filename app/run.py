@@ -0,0 +1,81 @@
+import argparse
+import build
+import emulator
+import time
+
+# Constants
+ENGINES = {
+    'reference': emulator.REFERENCE,
+    'threaded': emulator.THREADED,
+    'translated': emulator.TRANSLATED,
+}
+REGISTERS = ['A', 'B', 'C', 'X', 'Y', 'Z', 'I', 'J', 'SP', 'PC', 'EX', 'IA']
+CHUNK = 100000
+
+def load_program(emu, path):
+    if path.endswith(('.dasm', '.dasm16')):
+        emu.load(build.build_file(path).words)
+    else:
+        emu.load_file(path)
+
+def run(emu, cycles, until_halt=False):
+    end = emu.cycle + cycles
+    reason = emulator.STOP_BUDGET
+    while emu.cycle < end:
+        if emu.halt:
+            emu.halt = 0
+        reason = emu.n_cycles(min(end - emu.cycle, CHUNK))
+        if until_halt and reason == emulator.STOP_BRK:
+            break
+    return reason
+
+def registers(emu):
+    return ' '.join('%s=%04x' % (name, emu.ram[0x10000 + index])
+        for index, name in enumerate(REGISTERS))
+
+def save_screen(emu, path):
+    pixels, border = emu.render_screen()
+    if not isinstance(pixels, str):
+        pixels = pixels.tostring()
+    with open(path, 'wb') as fp:
+        fp.write('P6\n%d %d\n255\n' % (
+            emulator.LEM_WIDTH, emulator.LEM_HEIGHT))
+        fp.write(pixels)
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run a DCPU-16 program without the IDE.')
+    parser.add_argument('program', help='.dasm source or binary image')
+    parser.add_argument('--cycles', type=int, default=1000000,
+        help='cycle budget (default: %(default)s)')
+    parser.add_argument('--until-halt', action='store_true',
+        help='stop early when the program halts')
+    parser.add_argument('--engine', choices=sorted(ENGINES),
+        default='translated', help='(default: %(default)s)')
+    parser.add_argument('--replay', metavar='PATH',
+        help='replay recorded keyboard input')
+    parser.add_argument('--dump-ram', metavar='PATH',
+        help='write RAM as a big-endian binary image')
+    parser.add_argument('--screen', metavar='PATH',
+        help='write the LEM1802 display as a PPM image')
+    args = parser.parse_args()
+    emu = emulator.Emulator(ENGINES[args.engine])
+    load_program(emu, args.program)
+    if args.replay:
+        emu.replay(emulator.load_inputs(args.replay))
+    start = time.time()
+    reason = run(emu, args.cycles, args.until_halt)
+    elapsed = time.time() - start
+    print 'Cycles: %d%s' % (emu.cycle,
+        ' (halted)' if reason == emulator.STOP_BRK else '')
+    print 'Time: %.3f seconds' % elapsed
+    print 'Speed: %d cycles per second' % (emu.cycle / max(elapsed, 1e-6))
+    print 'Registers: %s' % registers(emu)
+    if args.dump_ram:
+        with open(args.dump_ram, 'wb') as fp:
+            fp.write(emu.dump())
+    if args.screen:
+        save_screen(emu, args.screen)
+
+if __name__ == '__main__':
+    main()
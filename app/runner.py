@@ -0,0 +1,66 @@
+import emulator
+import Queue
+import threading
+import time
+
+# Constants
+CYCLES_PER_SECOND = 100000
+MAX_CATCH_UP = 0.1
+INTERVAL = 0.005
+
+class Runner(object):
+    def __init__(self, emu, on_stop=None):
+        self.emu = emu
+        self.on_stop = on_stop
+        self.cycles_per_second = CYCLES_PER_SECOND
+        self.lock = threading.RLock()
+        self.inputs = Queue.Queue()
+        self.running = False
+        self.thread = None
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+    def stop(self):
+        self.running = False
+        thread = self.thread
+        self.thread = None
+        if thread and thread is not threading.current_thread():
+            thread.join()
+        self.do_inputs()
+    def post(self, func, *args):
+        self.inputs.put((func, args))
+        if not self.running:
+            self.do_inputs()
+    def do_inputs(self):
+        with self.lock:
+            while True:
+                try:
+                    func, args = self.inputs.get_nowait()
+                except Queue.Empty:
+                    break
+                func(*args)
+    def run(self):
+        budget = 0.0
+        last = time.time()
+        while self.running:
+            self.do_inputs()
+            now = time.time()
+            budget += min(now - last, MAX_CATCH_UP) * self.cycles_per_second
+            budget = min(budget, MAX_CATCH_UP * self.cycles_per_second)
+            last = now
+            cycles = int(budget)
+            if cycles:
+                budget -= cycles
+                with self.lock:
+                    reason = self.emu.n_cycles(cycles)
+                if self.emu.halt or reason in (
+                    emulator.STOP_BREAKPOINT, emulator.STOP_WATCHPOINT):
+                    self.running = False
+                    if self.on_stop:
+                        self.on_stop(reason)
+                    break
+            time.sleep(INTERVAL)
@@ -1,8 +1,13 @@
+from array import array
 import assembler
+import build
+import collections
 import editor
+import emulator
 import functools
 import icons
-import preprocessor
+import profiler
+import runner
 import sys
 import time
 import wx
@@ -15,6 +20,8 @@ HEIGHT = 96
 BORDER = 10
 CYCLES_PER_SECOND = 100000
 BLINK_RATE = 50000
+REFRESH_INTERVAL = 16
+ATLAS_SIZE = 1024
 
 FONT = [
     0xb79e, 0x388e, 0x722c, 0x75f4, 0x19bb, 0x7f8f, 0x85f9, 0xb158,
@@ -77,7 +84,7 @@ def menu_item(window, menu, label, func, kind=wx.ITEM_NORMAL):
     return item
 
 def tool_item(window, toolbar, label, func, icon):
-    item = toolbar.AddSimpleTool(-1, icon.GetBitmap(), label)
+    item = toolbar.AddSimpleTool(-1, icons.get_bitmap(icon), label)
     window.Bind(wx.EVT_TOOL, func, id=item.GetId())
     return item
 
@@ -92,8 +99,8 @@ def make_font(face, size, bold=False, italic=False, underline=False):
 
 def set_icon(window):
     bundle = wx.IconBundle()
-    bundle.AddIcon(wx.IconFromBitmap(icons.icon16.GetBitmap()))
-    bundle.AddIcon(wx.IconFromBitmap(icons.icon32.GetBitmap()))
+    bundle.AddIcon(wx.IconFromBitmap(icons.get_bitmap('icon16')))
+    bundle.AddIcon(wx.IconFromBitmap(icons.get_bitmap('icon32')))
     window.SetIcons(bundle)
 
 # Controls
@@ -105,6 +112,7 @@ class RamList(wx.ListCtrl):
         style = wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL
         super(RamList, self).__init__(parent, -1, style=style)
         self.emu = emu
+        self.watchpoints = set()
         self.InsertColumn(RamList.INDEX_ADDR, 'Addr')
         self.InsertColumn(RamList.INDEX_HEX, 'Hex')
         self.InsertColumn(RamList.INDEX_DEC, 'Dec')
@@ -115,7 +123,8 @@ class RamList(wx.ListCtrl):
         self.SetFont(make_font('Courier New', 9))
     def OnGetItemText(self, index, column):
         if column == RamList.INDEX_ADDR:
-            return '%04x' % index
+            marker = '*' if index in self.watchpoints else ''
+            return '%s%04x' % (marker, index)
         if column == RamList.INDEX_HEX:
             return '%04x' % self.emu.ram[index]
         if column == RamList.INDEX_DEC:
@@ -125,22 +134,34 @@ class RamList(wx.ListCtrl):
 class ProgramList(wx.ListCtrl):
     INDEX_ADDR = 0
     INDEX_CODE = 1
+    INDEX_CYCLES = 2
     def __init__(self, parent):
         style = wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL
         super(ProgramList, self).__init__(parent, -1, style=style)
         self.instructions = []
         self.lookup = {}
+        self.breakpoints = set()
+        self.profile = {}
+        self.total = 0
         self.InsertColumn(ProgramList.INDEX_ADDR, 'Addr')
         self.InsertColumn(ProgramList.INDEX_CODE, 'Code')
+        self.InsertColumn(ProgramList.INDEX_CYCLES, 'Cycles')
         self.SetColumnWidth(ProgramList.INDEX_ADDR, 55)
         self.SetColumnWidth(ProgramList.INDEX_CODE, 155)
+        self.SetColumnWidth(ProgramList.INDEX_CYCLES, 55)
         self.SetFont(make_font('Courier New', 9))
     def update(self, instructions):
         self.instructions = instructions
         self.lookup = {}
+        self.profile = {}
+        self.total = 0
         for index, instruction in enumerate(instructions):
             self.lookup[instruction.offset] = index
         self.SetItemCount(len(instructions))
+    def update_profile(self, profile):
+        self.profile = profile
+        self.total = sum(cycles for cycles, count in profile.itervalues())
+        self.Refresh()
     def focus(self, offset):
         if offset not in self.lookup:
             return
@@ -150,18 +171,58 @@ class ProgramList(wx.ListCtrl):
     def OnGetItemText(self, index, column):
         instruction = self.instructions[index]
         if column == ProgramList.INDEX_ADDR:
-            return '%04x' % instruction.offset
+            marker = '*' if instruction.offset in self.breakpoints else ''
+            return '%s%04x' % (marker, instruction.offset)
         if column == ProgramList.INDEX_CODE:
             return instruction.pretty().strip()
+        if column == ProgramList.INDEX_CYCLES:
+            cycles, count = self.profile.get(instruction.offset, (0, 0))
+            if not cycles:
+                return ''
+            return '%.1f%%' % (100.0 * cycles / self.total)
         return ''
 
+def color_rgb(value):
+    r, g, b = (value >> 8) & 0xf, (value >> 4) & 0xf, (value >> 0) & 0xf
+    return (r << 4) | r, (g << 4) | g, (b << 4) | b
+
+class GlyphAtlas(object):
+    def __init__(self, capacity=ATLAS_SIZE):
+        self.capacity = capacity
+        self.glyphs = collections.OrderedDict()
+    def get(self, bitmap, back, fore, scale):
+        key = (bitmap, back, fore, scale)
+        glyph = self.glyphs.pop(key, None)
+        if glyph is None:
+            glyph = self.render(bitmap, back, fore, scale)
+            if len(self.glyphs) >= self.capacity:
+                self.glyphs.popitem(last=False)
+        self.glyphs[key] = glyph
+        return glyph
+    def render(self, bitmap, back, fore, scale):
+        back = ''.join(chr(x) for x in color_rgb(back))
+        fore = ''.join(chr(x) for x in color_rgb(fore))
+        data = []
+        for j in xrange(8):
+            for i in xrange(4):
+                bit = (3 - i) * 8 + j
+                data.append(fore if bitmap & (1 << bit) else back)
+        image = wx.ImageFromData(4, 8, ''.join(data))
+        image.Rescale(4 * scale, 8 * scale)
+        return wx.BitmapFromImage(image)
+
 class Canvas(wx.Panel):
-    def __init__(self, parent, emu):
+    def __init__(self, parent, emu, runner):
         style = wx.WANTS_CHARS | wx.BORDER_STATIC
         super(Canvas, self).__init__(parent, style=style)
         self.emu = emu
+        self.runner = runner
         self.scale = 0
         self.cache = {}
+        self.atlas = GlyphAtlas()
+        self.stale = True
+        self.state = None
+        self.border = wx.BLACK_BRUSH
         self.bitmap = wx.EmptyBitmap(1, 1)
         self.SetBackgroundStyle(wx.BG_STYLE_CUSTOM)
         self.Bind(wx.EVT_SIZE, self.on_size)
@@ -176,17 +237,17 @@ class Canvas(wx.Panel):
         event.Skip()
         code = event.GetKeyCode()
         code = KEYS.get(code, code)
-        self.emu.on_key_down(code)
+        self.runner.post(self.emu.on_key_down, code)
     def on_key_up(self, event):
         event.Skip()
         code = event.GetKeyCode()
         code = KEYS.get(code, code)
-        self.emu.on_key_up(code)
+        self.runner.post(self.emu.on_key_up, code)
     def on_char(self, event):
         event.Skip()
         code = event.GetKeyCode()
         code = KEYS.get(code, code)
-        self.emu.on_char(code)
+        self.runner.post(self.emu.on_char, code)
     def on_size(self, event):
         event.Skip()
         self.Refresh()
@@ -196,6 +257,7 @@ class Canvas(wx.Panel):
         if scale != self.scale:
             self.scale = scale
             self.cache = {}
+            self.stale = True
             self.bitmap = wx.EmptyBitmap(WIDTH * scale, HEIGHT * scale)
             dc = wx.MemoryDC(self.bitmap)
             dc.SetBackground(wx.BLACK_BRUSH)
@@ -211,6 +273,17 @@ class Canvas(wx.Panel):
         dc.SetBackground(border_brush)
         dc.Clear()
         dc.Blit(dx, dy, bw, bh, mdc, 0, 0)
+    def mark_dirty(self, ranges):
+        regions = [
+            (self.emu.lem_screen, 384),
+            (self.emu.lem_font, 256),
+            (self.emu.lem_palette, 16),
+        ]
+        for start, end in ranges:
+            for address, size in regions:
+                if address and start < address + size and address < end:
+                    self.stale = True
+                    return
     def get_character(self, address, show_blink=True):
         value = self.emu.ram[address]
         character = value & 0x7f
@@ -225,9 +298,17 @@ class Canvas(wx.Panel):
         address = self.emu.lem_screen
         if not address:
             self.cache = {}
+            self.state = None
             dc.SetBackground(wx.BLACK_BRUSH)
             dc.Clear()
             return wx.BLACK_BRUSH
+        show_blink = bool((self.emu.cycle / BLINK_RATE) % 2)
+        state = (address, self.emu.lem_font, self.emu.lem_palette,
+            self.emu.lem_border, show_blink)
+        if not self.stale and state == self.state:
+            return self.border
+        self.stale = False
+        self.state = state
         font_address = self.emu.lem_font
         if font_address:
             font = self.emu.ram[font_address : font_address + 256]
@@ -238,13 +319,6 @@ class Canvas(wx.Panel):
             palette = self.emu.ram[palette_address : palette_address + 16]
         else:
             palette = PALETTE
-        brushes = []
-        for x in palette:
-            r, g, b = (x >> 8) & 0xf, (x >> 4) & 0xf, (x >> 0) & 0xf
-            r, g, b = (r << 4) | r, (g << 4) | g, (b << 4) | b
-            brushes.append(wx.Brush(wx.Colour(r, g, b)))
-        dc.SetPen(wx.TRANSPARENT_PEN)
-        show_blink = bool((self.emu.cycle / BLINK_RATE) % 2)
         for j in xrange(12):
             for i in xrange(32):
                 ch, back, fore = self.get_character(address, show_blink)
@@ -255,36 +329,27 @@ class Canvas(wx.Panel):
                 if self.cache.get((i, j)) != key:
                     self.cache[(i, j)] = key
                     x, y = i * 4 * self.scale, j * 8 * self.scale
-                    self.draw_character(dc, x, y, brushes[back],
-                        brushes[fore], bitmap)
+                    glyph = self.atlas.get(bitmap, palette[back],
+                        palette[fore], self.scale)
+                    dc.DrawBitmap(glyph, x, y)
                 address += 1
-        return brushes[self.emu.lem_border & 0xf]
-    def draw_character(self, dc, x, y, back, fore, bitmap):
-        mask = 1
-        for i in xrange(3, -1, -1):
-            for j in xrange(8):
-                dx = i * self.scale
-                dy = j * self.scale
-                if bitmap & mask:
-                    dc.SetBrush(fore)
-                else:
-                    dc.SetBrush(back)
-                dc.DrawRectangle(x + dx, y + dy, self.scale, self.scale)
-                mask <<= 1
+        border = palette[self.emu.lem_border & 0xf]
+        self.border = wx.Brush(wx.Colour(*color_rgb(border)))
+        return self.border
 
 class Frame(wx.Frame):
     def __init__(self, emu):
         super(Frame, self).__init__(None)
         self.emu = emu
-        self.last_time = time.time()
+        self.runner = runner.Runner(emu, self.on_runner_stop)
         self.last_refresh = time.time()
         self._path = None
         self._dirty = False
+        self.ram_dirty = set()
         self.program = None
         self.running = False
         self.step_power = 0
         self.refresh_rate = 1
-        self.cycles_per_second = CYCLES_PER_SECOND
         self.show_debug = True
         self.debug_controls = []
         set_icon(self)
@@ -353,6 +418,7 @@ class Frame(wx.Frame):
         if veto and can_veto:
             event.Veto()
             return
+        self.runner.stop()
         event.Skip()
     def create_menu(self):
         menubar = wx.MenuBar()
@@ -363,6 +429,7 @@ class Frame(wx.Frame):
         menu_item(self, menu, 'Save\tCtrl+S', self.on_save)
         menu_item(self, menu, 'Save As...\tCtrl+Shift+S', self.on_save_as)
         menu_item(self, menu, 'Save Binary...\tCtrl+D', self.on_save_binary)
+        menu_item(self, menu, 'Save Input...', self.on_save_input)
         menu.AppendSeparator()
         menu_item(self, menu, 'Exit\tAlt+F4', self.on_exit)
         menubar.Append(menu, '&File')
@@ -383,6 +450,18 @@ class Frame(wx.Frame):
         menu_item(self, menu, 'Start\tF5', self.on_start)
         menu_item(self, menu, 'Stop\tF6', self.on_stop)
         menu_item(self, menu, 'Step\tF7', self.on_step)
+        menu_item(self, menu, 'Replay Input...', self.on_replay_input)
+        menu.AppendSeparator()
+        menu_item(self, menu, 'Toggle Breakpoint\tF9',
+            self.on_toggle_breakpoint)
+        menu_item(self, menu, 'Clear Breakpoints', self.on_clear_breakpoints)
+        menu_item(self, menu, 'Toggle Watchpoint\tShift+F9',
+            self.on_toggle_watchpoint)
+        menu_item(self, menu, 'Clear Watchpoints', self.on_clear_watchpoints)
+        menu.AppendSeparator()
+        menu_item(self, menu, 'Profile', self.on_toggle_profile,
+            wx.ITEM_CHECK)
+        menu_item(self, menu, 'Clear Profile', self.on_clear_profile)
         menu.AppendSeparator()
         for power in range(6):
             func = functools.partial(self.on_step_power, power=power)
@@ -420,14 +499,14 @@ class Frame(wx.Frame):
         style = wx.HORIZONTAL | wx.TB_FLAT | wx.TB_NODIVIDER
         toolbar = self.CreateToolBar(style)
         toolbar.SetToolBitmapSize((18, 18))
-        tool_item(self, toolbar, 'New', self.on_new, icons.page)
-        tool_item(self, toolbar, 'Open', self.on_open, icons.folder_page)
-        tool_item(self, toolbar, 'Save', self.on_save, icons.disk)
+        tool_item(self, toolbar, 'New', self.on_new, 'page')
+        tool_item(self, toolbar, 'Open', self.on_open, 'folder_page')
+        tool_item(self, toolbar, 'Save', self.on_save, 'disk')
         toolbar.AddSeparator()
-        tool_item(self, toolbar, 'Assemble', self.on_assemble, icons.basket_put)
-        tool_item(self, toolbar, 'Start', self.on_start, icons.control_play)
-        tool_item(self, toolbar, 'Stop', self.on_stop, icons.control_stop)
-        tool_item(self, toolbar, 'Step', self.on_step, icons.control_end)
+        tool_item(self, toolbar, 'Assemble', self.on_assemble, 'basket_put')
+        tool_item(self, toolbar, 'Start', self.on_start, 'control_play')
+        tool_item(self, toolbar, 'Stop', self.on_stop, 'control_stop')
+        tool_item(self, toolbar, 'Step', self.on_step, 'control_end')
         toolbar.Realize()
         toolbar.Fit()
     def create_statusbar(self):
@@ -453,10 +532,13 @@ class Frame(wx.Frame):
         if flags:
             self.path = None
             self.dirty = False
+        self.runner.stop()
         self.running = False
         self.program = None
         self.emu.reset()
         self.program_list.update([])
+        self.on_clear_breakpoints(None)
+        self.on_clear_watchpoints(None)
         self.refresh_debug_info()
     def on_new(self, event):
         if not self.check_dirty():
@@ -476,7 +558,8 @@ class Frame(wx.Frame):
                 wx.CallAfter(self.assemble)
             else:
                 self.program = assembler.disassemble_file(path)
-                self.emu.load(self.program.assemble())
+                self.program.words = array('H', self.program.assemble())
+                self.emu.load(self.program.words)
                 self.program_list.update(self.program.instructions)
                 text = self.program.pretty()
             self.editor.SetText(text)
@@ -520,12 +603,7 @@ class Frame(wx.Frame):
         else:
             return False
     def save_binary(self, path):
-        words = self.program.assemble()
-        data = []
-        for word in words:
-            data.append(chr((word >> 8) & 0xff))
-            data.append(chr((word >> 0) & 0xff))
-        data = ''.join(data)
+        data = assembler.bytes_from_words(self.program.words)
         with open(path, 'wb') as fp:
             fp.write(data)
     def on_save_binary(self, event):
@@ -537,6 +615,15 @@ class Frame(wx.Frame):
             path = dialog.GetPath()
             self.save_binary(path)
         dialog.Destroy()
+    def on_save_input(self, event):
+        with self.runner.lock:
+            records = list(self.emu.recording)
+        dialog = wx.FileDialog(self, 'Save Input', wildcard='*.rec',
+            style=wx.FD_SAVE | wx.FD_OVERWRITE_PROMPT)
+        if dialog.ShowModal() == wx.ID_OK:
+            path = dialog.GetPath()
+            emulator.save_inputs(path, records)
+        dialog.Destroy()
     def on_undo(self, event):
         self.editor.Undo()
         self.dirty = self.editor.GetModify()
@@ -559,8 +646,8 @@ class Frame(wx.Frame):
         text = self.editor.GetText()
         try:
             self.reset(False)
-            self.program = assembler.parse(preprocessor.preprocess(text))
-            self.emu.load(self.program.assemble())
+            self.program = build.build(text)
+            self.emu.load(self.program.words)
             self.program_list.update(self.program.instructions)
             self.refresh_debug_info()
         except Exception as e:
@@ -573,19 +660,105 @@ class Frame(wx.Frame):
         self.assemble()
     def on_start(self, event):
         self.running = True
+        self.runner.start()
+        self.GetStatusBar().SetStatusText('', 3)
         self.refresh_debug_info()
     def on_stop(self, event):
+        self.runner.stop()
         self.running = False
         self.refresh_debug_info()
     def on_step(self, event):
         if not self.running:
             steps = 10 ** self.step_power
-            self.emu.n_steps(steps)
+            self.GetStatusBar().SetStatusText('', 3)
+            self.on_stop_reason(self.emu.n_steps(steps))
             self.refresh_debug_info()
+    def on_replay_input(self, event):
+        if self.program is None:
+            return
+        dialog = wx.FileDialog(self, 'Replay Input', wildcard='*.rec',
+            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST)
+        if dialog.ShowModal() == wx.ID_OK:
+            records = emulator.load_inputs(dialog.GetPath())
+            self.runner.stop()
+            self.running = False
+            self.emu.load(self.program.words)
+            self.emu.replay(records)
+            self.refresh_debug_info()
+        dialog.Destroy()
+    def on_stop_reason(self, reason):
+        if reason == emulator.STOP_BREAKPOINT:
+            message = 'Breakpoint at %04x' % self.emu.stop_address
+        elif reason == emulator.STOP_WATCHPOINT:
+            message = 'Watchpoint at %04x' % self.emu.stop_address
+        else:
+            return False
+        self.running = False
+        self.GetStatusBar().SetStatusText(message, 3)
+        self.program_list.focus(self.emu.ram[0x10009])
+        if reason == emulator.STOP_WATCHPOINT:
+            self.ram_list.EnsureVisible(self.emu.stop_address)
+        return True
+    def toggle_breakpoint(self, index):
+        offset = self.program_list.instructions[index].offset
+        breakpoints = self.program_list.breakpoints
+        enabled = offset not in breakpoints
+        if enabled:
+            breakpoints.add(offset)
+        else:
+            breakpoints.remove(offset)
+        with self.runner.lock:
+            self.emu.set_breakpoint(offset, enabled)
+        self.program_list.RefreshItem(index)
+    def toggle_watchpoint(self, address):
+        watchpoints = self.ram_list.watchpoints
+        if address in watchpoints:
+            watchpoints.remove(address)
+        elif len(watchpoints) < emulator.MAX_WATCHPOINTS:
+            watchpoints.add(address)
+        access = emulator.WATCH_READ | emulator.WATCH_WRITE
+        with self.runner.lock:
+            self.emu.clear_watchpoints()
+            for value in sorted(watchpoints):
+                self.emu.add_watchpoint(value, access=access)
+        self.ram_list.RefreshItem(address)
+    def on_toggle_breakpoint(self, event):
+        index = self.program_list.GetFirstSelected()
+        if index >= 0:
+            self.toggle_breakpoint(index)
+    def on_clear_breakpoints(self, event):
+        self.program_list.breakpoints.clear()
+        with self.runner.lock:
+            self.emu.clear_breakpoints()
+        self.program_list.Refresh()
+    def on_toggle_watchpoint(self, event):
+        index = self.ram_list.GetFirstSelected()
+        if index >= 0:
+            self.toggle_watchpoint(index)
+    def on_clear_watchpoints(self, event):
+        self.ram_list.watchpoints.clear()
+        with self.runner.lock:
+            self.emu.clear_watchpoints()
+        self.ram_list.Refresh()
+    def on_toggle_profile(self, event):
+        with self.runner.lock:
+            if event.IsChecked():
+                self.emu.enable_profile()
+            else:
+                self.emu.disable_profile()
+        self.refresh_debug_info()
+    def on_clear_profile(self, event):
+        with self.runner.lock:
+            self.emu.clear_profile()
+        self.refresh_debug_info()
+    def on_program_activated(self, event):
+        self.toggle_breakpoint(event.GetIndex())
+    def on_ram_activated(self, event):
+        self.toggle_watchpoint(event.GetIndex())
     def on_step_power(self, event, power):
         self.step_power = power
     def on_clock_rate(self, event, power):
-        self.cycles_per_second = CYCLES_PER_SECOND * (2 ** power)
+        self.runner.cycles_per_second = CYCLES_PER_SECOND * (2 ** power)
     def on_toggle_debug(self, event):
         self.show_debug = not self.show_debug
         self.show_debug_controls(self.show_debug)
@@ -601,15 +774,22 @@ class Frame(wx.Frame):
     def on_text(self, event):
         event.Skip()
         self.dirty = self.editor.GetModify()
-    def update(self, dt):
-        if self.running:
-            cycles = int(dt * self.cycles_per_second)
-            self.emu.n_cycles(cycles)
-            if self.emu.halt:
-                self.running = False
-                self.emu.halt = 0
-                self.refresh_debug_info()
+    def on_runner_stop(self, reason):
+        wx.CallAfter(self.on_runner_stopped, reason)
+    def on_runner_stopped(self, reason):
+        self.running = False
+        if self.emu.halt:
+            self.emu.halt = 0
+        else:
+            self.on_stop_reason(reason)
+        self.refresh_debug_info()
+    def take_dirty(self):
+        with self.runner.lock:
+            ranges = self.emu.take_dirty()
+        self.canvas.mark_dirty(ranges)
+        self.ram_dirty.update(ranges)
     def refresh(self):
+        self.take_dirty()
         self.canvas.Refresh()
         self.canvas.Update()
         if self.running and self.refresh_rate >= 0:
@@ -619,16 +799,21 @@ class Frame(wx.Frame):
         self.last_refresh = time.time()
         self.update_statusbar()
         self.program_list.focus(self.emu.ram[0x10009])
-        self.ram_list.RefreshItems(0, self.ram_list.GetItemCount() - 1)
+        profile = self.emu.profile()
+        if profile and self.program:
+            self.program_list.update_profile(
+                profiler.by_instruction(self.program, *profile))
+        elif self.program_list.profile:
+            self.program_list.update_profile({})
+        self.take_dirty()
+        for start, end in self.ram_dirty:
+            self.ram_list.RefreshItems(start, end - 1)
+        self.ram_dirty.clear()
         for address, widget in self.registers.iteritems():
             widget.SetValue('%04x' % self.emu.ram[address])
     def on_timer(self):
-        now = time.time()
-        dt = now - self.last_time
-        self.last_time = now
-        self.update(dt)
         self.refresh()
-        wx.CallLater(10, self.on_timer)
+        wx.CallLater(REFRESH_INTERVAL, self.on_timer)
     def create_controls(self, parent):
         body = self.create_body(parent)
         sizer = wx.BoxSizer(wx.VERTICAL)
@@ -636,10 +821,13 @@ class Frame(wx.Frame):
         return sizer
     def create_body(self, parent):
         self.program_list = ProgramList(parent)
-        self.program_list.SetInitialSize((245, -1))
+        self.program_list.SetInitialSize((300, -1))
+        self.program_list.Bind(wx.EVT_LIST_ITEM_ACTIVATED,
+            self.on_program_activated)
         center = self.create_center(parent)
         self.ram_list = RamList(parent, self.emu)
         self.ram_list.SetInitialSize((200, -1))
+        self.ram_list.Bind(wx.EVT_LIST_ITEM_ACTIVATED, self.on_ram_activated)
         sizer = wx.BoxSizer(wx.HORIZONTAL)
         c1 = sizer.Add(self.program_list, 0, wx.EXPAND)
         c2 = sizer.AddSpacer(10)
@@ -675,7 +863,7 @@ class Frame(wx.Frame):
         return panel
     def create_canvas(self, parent):
         panel = wx.Panel(parent)
-        self.canvas = Canvas(panel, self.emu)
+        self.canvas = Canvas(panel, self.emu, self.runner)
         sizer = wx.BoxSizer(wx.VERTICAL)
         sizer.Add(self.canvas, 1, wx.EXPAND | wx.ALL, 5)
         panel.SetSizer(sizer)
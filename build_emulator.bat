@@ -1,3 +1,3 @@
 gcc -std=c99 -O3 -c emulator\*.c
-gcc -shared -o _emulator.dll *.o
+gcc -shared -o _emulator.dll *.o -lpthread
 del *.o
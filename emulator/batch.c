@@ -0,0 +1,145 @@
+#include <limits.h>
+#include <pthread.h>
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <unistd.h>
+#endif
+#include "common.h"
+#include "emulator.h"
+#include "batch.h"
+
+#define MAX_THREADS 256
+
+// Batch Job
+typedef struct {
+    Emulator **emulators;
+    unsigned int count;
+    unsigned int cycles;
+    unsigned long long int until;
+    unsigned char *halted;
+    unsigned int next;
+} Job;
+
+// Thread Pool
+static pthread_mutex_t run_mutex = PTHREAD_MUTEX_INITIALIZER;
+static pthread_mutex_t pool_mutex = PTHREAD_MUTEX_INITIALIZER;
+static pthread_cond_t start_cond = PTHREAD_COND_INITIALIZER;
+static pthread_cond_t done_cond = PTHREAD_COND_INITIALIZER;
+static pthread_t workers[MAX_THREADS];
+static unsigned int starts[MAX_THREADS];
+static unsigned int n_workers = 0;
+static unsigned int n_threads = 0;
+static unsigned int generation = 0;
+static unsigned int active = 0;
+static unsigned int busy = 0;
+static Job job;
+
+static unsigned int cpu_count(void) {
+#ifdef _WIN32
+    SYSTEM_INFO info;
+    GetSystemInfo(&info);
+    return info.dwNumberOfProcessors;
+#else
+    long count = sysconf(_SC_NPROCESSORS_ONLN);
+    return count > 0 ? count : 1;
+#endif
+}
+
+static void work(Job *job) {
+    unsigned int index;
+    while ((index = __sync_fetch_and_add(&job->next, 1)) < job->count) {
+        Emulator *emulator = job->emulators[index];
+        if (!job->until) {
+            n_cycles(emulator, job->cycles);
+        }
+        else if (CYCLE < job->until) {
+            unsigned long long int cycles = job->until - CYCLE;
+            n_cycles(emulator, cycles > UINT_MAX ? UINT_MAX : cycles);
+        }
+        job->halted[index] = HALT ? 1 : 0;
+    }
+}
+
+static void *worker(void *arg) {
+    unsigned int index = (unsigned int)(size_t)arg;
+    unsigned int seen = starts[index];
+    pthread_mutex_lock(&pool_mutex);
+    while (1) {
+        while (generation == seen) {
+            pthread_cond_wait(&start_cond, &pool_mutex);
+        }
+        seen = generation;
+        if (index >= active) {
+            continue;
+        }
+        pthread_mutex_unlock(&pool_mutex);
+        work(&job);
+        pthread_mutex_lock(&pool_mutex);
+        if (--busy == 0) {
+            pthread_cond_signal(&done_cond);
+        }
+    }
+    return 0;
+}
+
+void set_threads(unsigned int threads) {
+    if (threads > MAX_THREADS) {
+        threads = MAX_THREADS;
+    }
+    if (!threads) {
+        threads = 1;
+    }
+    pthread_mutex_lock(&run_mutex);
+    pthread_mutex_lock(&pool_mutex);
+    n_threads = threads;
+    while (n_workers + 1 < threads) {
+        starts[n_workers] = generation;
+        if (pthread_create(&workers[n_workers], 0, worker,
+            (void *)(size_t)n_workers)) {
+            break;
+        }
+        pthread_detach(workers[n_workers]);
+        n_workers++;
+    }
+    pthread_mutex_unlock(&pool_mutex);
+    pthread_mutex_unlock(&run_mutex);
+}
+
+static void run_job(Emulator **emulators, unsigned int count,
+    unsigned int cycles, unsigned long long int until,
+    unsigned char *halted) {
+    if (!n_threads) {
+        set_threads(cpu_count());
+    }
+    pthread_mutex_lock(&run_mutex);
+    pthread_mutex_lock(&pool_mutex);
+    job.emulators = emulators;
+    job.count = count;
+    job.cycles = cycles;
+    job.until = until;
+    job.halted = halted;
+    job.next = 0;
+    active = n_threads - 1 < n_workers ? n_threads - 1 : n_workers;
+    busy = active;
+    generation++;
+    pthread_cond_broadcast(&start_cond);
+    pthread_mutex_unlock(&pool_mutex);
+    work(&job);
+    pthread_mutex_lock(&pool_mutex);
+    while (busy) {
+        pthread_cond_wait(&done_cond, &pool_mutex);
+    }
+    pthread_mutex_unlock(&pool_mutex);
+    pthread_mutex_unlock(&run_mutex);
+}
+
+void run_many(Emulator **emulators, unsigned int count, unsigned int cycles,
+    unsigned char *halted) {
+    run_job(emulators, count, cycles, 0, halted);
+}
+
+void run_until(Emulator **emulators, unsigned int count,
+    unsigned long long int cycle, unsigned char *halted) {
+    run_job(emulators, count, 0, cycle, halted);
+}
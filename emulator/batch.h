@@ -0,0 +1,14 @@
+#ifndef BATCH_H
+#define BATCH_H
+
+#include "emulator.h"
+
+void set_threads(unsigned int threads);
+
+void run_many(Emulator **emulators, unsigned int count, unsigned int cycles,
+    unsigned char *halted);
+
+void run_until(Emulator **emulators, unsigned int count,
+    unsigned long long int cycle, unsigned char *halted);
+
+#endif
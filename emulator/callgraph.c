@@ -0,0 +1,86 @@
+#include <stdlib.h>
+#include "common.h"
+#include "emulator.h"
+#include "callgraph.h"
+
+// Call Graph Functions
+int enable_call_graph(Emulator *emulator, unsigned int period,
+    unsigned int capacity) {
+    disable_call_graph(emulator);
+    if (!period || capacity < MAX_CALL_DEPTH + 3) {
+        return 0;
+    }
+    emulator->call_stack = calloc(MAX_CALL_DEPTH, sizeof(unsigned int));
+    emulator->call_sites = calloc(MAX_CALL_DEPTH, sizeof(unsigned short));
+    emulator->samples = calloc(capacity, sizeof(unsigned int));
+    if (!emulator->call_stack || !emulator->call_sites ||
+        !emulator->samples) {
+        disable_call_graph(emulator);
+        return 0;
+    }
+    emulator->call_depth = 0;
+    emulator->sample_period = period;
+    emulator->sample_capacity = capacity;
+    emulator->sample_cycle = CYCLE + period;
+    emulator->sample_size = 0;
+    emulator->samples_dropped = 0;
+    emulator->hooks |= HOOK_CALLS;
+    return 1;
+}
+
+void disable_call_graph(Emulator *emulator) {
+    free(emulator->call_stack);
+    free(emulator->call_sites);
+    free(emulator->samples);
+    emulator->call_stack = 0;
+    emulator->call_sites = 0;
+    emulator->samples = 0;
+    emulator->call_depth = 0;
+    emulator->sample_capacity = 0;
+    emulator->sample_size = 0;
+    emulator->samples_dropped = 0;
+    emulator->hooks &= ~HOOK_CALLS;
+}
+
+void clear_call_graph(Emulator *emulator) {
+    emulator->sample_size = 0;
+    emulator->samples_dropped = 0;
+}
+
+void enter_frame(Emulator *emulator, unsigned short site,
+    unsigned short entry, unsigned int flags) {
+    if (emulator->call_depth < MAX_CALL_DEPTH) {
+        emulator->call_stack[emulator->call_depth] = entry | flags;
+        emulator->call_sites[emulator->call_depth] = site;
+    }
+    emulator->call_depth++;
+}
+
+void leave_frame(Emulator *emulator) {
+    if (emulator->call_depth) {
+        emulator->call_depth--;
+    }
+}
+
+void sample_call_graph(Emulator *emulator) {
+    unsigned int depth = emulator->call_depth;
+    unsigned int *record;
+    if (depth > MAX_CALL_DEPTH) {
+        depth = MAX_CALL_DEPTH;
+    }
+    while (emulator->sample_cycle <= CYCLE) {
+        emulator->sample_cycle += emulator->sample_period;
+    }
+    if (emulator->sample_size + depth + 3 > emulator->sample_capacity) {
+        emulator->samples_dropped++;
+        return;
+    }
+    record = emulator->samples + emulator->sample_size;
+    record[0] = depth;
+    record[1] = depth ? emulator->call_sites[0] : PC;
+    for (unsigned int i = 0; i < depth; i++) {
+        record[i + 2] = emulator->call_stack[i];
+    }
+    record[depth + 2] = PC;
+    emulator->sample_size += depth + 3;
+}
@@ -0,0 +1,20 @@
+#ifndef CALLGRAPH_H
+#define CALLGRAPH_H
+
+#include "emulator.h"
+
+int enable_call_graph(Emulator *emulator, unsigned int period,
+    unsigned int capacity);
+
+void disable_call_graph(Emulator *emulator);
+
+void clear_call_graph(Emulator *emulator);
+
+void enter_frame(Emulator *emulator, unsigned short site,
+    unsigned short entry, unsigned int flags);
+
+void leave_frame(Emulator *emulator);
+
+void sample_call_graph(Emulator *emulator);
+
+#endif
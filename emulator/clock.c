@@ -8,6 +8,8 @@ void on_clock(Emulator *emulator) {
             emulator->clock_cycle = REG(1) ? NEXT_TICK : 0;
             emulator->clock_rate = REG(1);
             emulator->clock_ticks = 0;
+            schedule(emulator, EVENT_CLOCK,
+                REG(1) ? emulator->clock_cycle : NO_EVENT);
             break;
         case 1: // GET_TICKS
             REG(2) = emulator->clock_ticks;
@@ -18,14 +20,13 @@ void on_clock(Emulator *emulator) {
     }
 }
 
-void on_clock_step(Emulator *emulator) {
+void on_clock_tick(Emulator *emulator) {
     if (emulator->clock_rate) {
-        if (emulator->cycle >= emulator->clock_cycle) {
-            emulator->clock_ticks++;
-            emulator->clock_cycle = NEXT_TICK;
-            if (emulator->clock_message) {
-                interrupt(emulator, emulator->clock_message);
-            }
+        emulator->clock_ticks++;
+        emulator->clock_cycle = NEXT_TICK;
+        schedule(emulator, EVENT_CLOCK, emulator->clock_cycle);
+        if (emulator->clock_message) {
+            interrupt(emulator, emulator->clock_message);
         }
     }
 }
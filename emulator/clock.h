@@ -5,6 +5,6 @@
 
 void on_clock(Emulator *emulator);
 
-void on_clock_step(Emulator *emulator);
+void on_clock_tick(Emulator *emulator);
 
 #endif
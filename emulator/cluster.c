@@ -0,0 +1,196 @@
+#include <stdlib.h>
+#include <string.h>
+#include "common.h"
+#include "emulator.h"
+#include "batch.h"
+#include "devices.h"
+#include "cluster.h"
+
+// Mailbox Handlers
+static void on_mailbox(Emulator *emulator, void *state) {
+    Mailbox *mailbox = state;
+    Message *message;
+    switch (REG(0)) {
+        case 0: // QUERY
+            REG(1) = mailbox->node;
+            REG(2) = mailbox->nodes;
+            REG(3) = mailbox->inbox_count;
+            break;
+        case 1: // SEND
+            if (mailbox->outbox_count == MAILBOX_SIZE ||
+                (REG(1) >= mailbox->nodes &&
+                REG(1) != MAILBOX_BROADCAST)) {
+                REG(1) = 0;
+                break;
+            }
+            message = mailbox->outbox + mailbox->outbox_count++;
+            message->node = REG(1);
+            message->word = REG(2);
+            REG(1) = 1;
+            break;
+        case 2: // RECEIVE
+            if (!mailbox->inbox_count) {
+                REG(1) = MAILBOX_BROADCAST;
+                REG(2) = 0;
+                REG(3) = 0;
+                break;
+            }
+            message = mailbox->inbox + mailbox->inbox_head;
+            mailbox->inbox_head = (mailbox->inbox_head + 1) % MAILBOX_SIZE;
+            mailbox->inbox_count--;
+            REG(1) = message->node;
+            REG(2) = message->word;
+            REG(3) = mailbox->inbox_count;
+            break;
+        case 3: // SET_INTERRUPT
+            mailbox->message = REG(3);
+            break;
+    }
+}
+
+static void on_mailbox_reset(Emulator *emulator, void *state) {
+    Mailbox *mailbox = state;
+    (void)emulator;
+    mailbox->inbox_head = 0;
+    mailbox->inbox_count = 0;
+    mailbox->outbox_count = 0;
+    mailbox->dropped = 0;
+    mailbox->message = 0;
+}
+
+static void on_mailbox_save(Emulator *emulator, void *state, void *data) {
+    (void)emulator;
+    memcpy(data, state, sizeof(Mailbox));
+}
+
+static void on_mailbox_restore(Emulator *emulator, void *state,
+    void *data) {
+    (void)emulator;
+    memcpy(state, data, sizeof(Mailbox));
+}
+
+// Delivery
+static int post(Mailbox *mailbox, unsigned short node, unsigned short word) {
+    Message *message;
+    if (mailbox->inbox_count == MAILBOX_SIZE) {
+        mailbox->dropped++;
+        return 0;
+    }
+    message = mailbox->inbox +
+        (mailbox->inbox_head + mailbox->inbox_count) % MAILBOX_SIZE;
+    message->node = node;
+    message->word = word;
+    mailbox->inbox_count++;
+    return 1;
+}
+
+static void deliver(Cluster *cluster) {
+    unsigned char *arrived = cluster->arrived;
+    for (unsigned int i = 0; i < cluster->count; i++) {
+        arrived[i] = 0;
+    }
+    for (unsigned int i = 0; i < cluster->count; i++) {
+        Mailbox *mailbox = cluster->mailboxes + i;
+        for (unsigned int j = 0; j < mailbox->outbox_count; j++) {
+            Message *message = mailbox->outbox + j;
+            for (unsigned int k = 0; k < cluster->count; k++) {
+                if (k != i && (message->node == k ||
+                    message->node == MAILBOX_BROADCAST)) {
+                    arrived[k] |= post(cluster->mailboxes + k, i,
+                        message->word);
+                }
+            }
+        }
+        mailbox->outbox_count = 0;
+    }
+    for (unsigned int i = 0; i < cluster->count; i++) {
+        Mailbox *mailbox = cluster->mailboxes + i;
+        if (arrived[i] && mailbox->message) {
+            interrupt(cluster->nodes[i], mailbox->message);
+        }
+    }
+}
+
+// Cluster Functions
+Cluster *create_cluster(Emulator **nodes, unsigned int count,
+    unsigned int quantum) {
+    Cluster *cluster;
+    if (!count || count >= MAILBOX_BROADCAST) {
+        return 0;
+    }
+    cluster = calloc(1, sizeof(Cluster));
+    if (!cluster) {
+        return 0;
+    }
+    cluster->nodes = malloc(sizeof(Emulator *) * count);
+    cluster->mailboxes = calloc(count, sizeof(Mailbox));
+    cluster->halted = calloc(count, 1);
+    cluster->arrived = calloc(count, 1);
+    if (!cluster->nodes || !cluster->mailboxes || !cluster->halted ||
+        !cluster->arrived) {
+        release_cluster(cluster);
+        return 0;
+    }
+    cluster->count = count;
+    cluster->quantum = quantum ? quantum : DEFAULT_QUANTUM;
+    for (unsigned int i = 0; i < count; i++) {
+        Mailbox *mailbox = cluster->mailboxes + i;
+        int index = attach_device(nodes[i], 0x4d424f58, 0x1c6c8b36, 0x0001,
+            on_mailbox, 0, mailbox);
+        if (index < 0) {
+            release_cluster(cluster);
+            return 0;
+        }
+        nodes[i]->devices[index].on_reset = on_mailbox_reset;
+        nodes[i]->devices[index].on_save = on_mailbox_save;
+        nodes[i]->devices[index].on_restore = on_mailbox_restore;
+        nodes[i]->devices[index].save_size = sizeof(Mailbox);
+        cluster->nodes[i] = nodes[i];
+        cluster->count = i + 1;
+        mailbox->node = i;
+        mailbox->nodes = count;
+        mailbox->index = index;
+        if (nodes[i]->cycle > cluster->cycle) {
+            cluster->cycle = nodes[i]->cycle;
+        }
+    }
+    return cluster;
+}
+
+void release_cluster(Cluster *cluster) {
+    if (cluster->nodes && cluster->mailboxes) {
+        for (unsigned int i = 0; i < cluster->count; i++) {
+            Emulator *node = cluster->nodes[i];
+            Mailbox *mailbox = cluster->mailboxes + i;
+            if (mailbox->index < node->n_devices &&
+                node->devices[mailbox->index].state == mailbox) {
+                detach_device(node, mailbox->index);
+            }
+        }
+    }
+    free(cluster->nodes);
+    free(cluster->mailboxes);
+    free(cluster->halted);
+    free(cluster->arrived);
+    free(cluster);
+}
+
+unsigned int run_cluster(Cluster *cluster, unsigned int cycles) {
+    unsigned long long int end = cluster->cycle + cycles;
+    unsigned int halted = 0;
+    while (cluster->cycle < end) {
+        unsigned long long int quantum = end - cluster->cycle;
+        if (quantum > cluster->quantum) {
+            quantum = cluster->quantum;
+        }
+        cluster->cycle += quantum;
+        run_until(cluster->nodes, cluster->count, cluster->cycle,
+            cluster->halted);
+        halted = 0;
+        for (unsigned int i = 0; i < cluster->count; i++) {
+            halted += cluster->halted[i];
+        }
+        deliver(cluster);
+    }
+    return halted;
+}
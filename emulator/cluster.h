@@ -0,0 +1,44 @@
+#ifndef CLUSTER_H
+#define CLUSTER_H
+
+#include "emulator.h"
+
+// Mailbox Message
+typedef struct {
+    unsigned short node;
+    unsigned short word;
+} Message;
+
+// Mailbox Device
+typedef struct {
+    Message inbox[MAILBOX_SIZE];
+    Message outbox[MAILBOX_SIZE];
+    unsigned int inbox_head;
+    unsigned int inbox_count;
+    unsigned int outbox_count;
+    unsigned int dropped;
+    unsigned short node;
+    unsigned short message;
+    unsigned short nodes;
+    unsigned short index;
+} Mailbox;
+
+// Cluster
+typedef struct {
+    Emulator **nodes;
+    Mailbox *mailboxes;
+    unsigned char *halted;
+    unsigned char *arrived;
+    unsigned int count;
+    unsigned int quantum;
+    unsigned long long int cycle;
+} Cluster;
+
+Cluster *create_cluster(Emulator **nodes, unsigned int count,
+    unsigned int quantum);
+
+void release_cluster(Cluster *cluster);
+
+unsigned int run_cluster(Cluster *cluster, unsigned int cycles);
+
+#endif
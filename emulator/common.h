@@ -13,10 +13,15 @@
 #define LT_ADDR 0x1000c
 
 // Helper Macros
+#define INTERRUPT_SIZE 256
+#define KEYBOARD_SIZE 16
 #define NEXT_TICK (emulator->cycle + 100000 * emulator->clock_rate / 60)
 #define CONDITIONAL(opcode) ((opcode) >= 0x10 && (opcode) <= 0x17)
 #define CYCLES(count) (emulator->cycle += (count))
 #define RAM(address) (emulator->ram[(address)])
+#define STORE(address, value) store(emulator, (address), (value))
+#define UNCHECKED_STORE(address, value) \
+    unchecked_store(emulator, (address), (value))
 #define REG(index) (emulator->ram[REG_ADDR + (index)])
 #define SP (emulator->ram[SP_ADDR])
 #define PC (emulator->ram[PC_ADDR])
@@ -26,6 +31,7 @@
 #define SKIP (emulator->skip)
 #define HALT (emulator->halt)
 #define CYCLE (emulator->cycle)
+#define WAKE() (emulator->event_cycle = 0)
 
 // Basic Opcodes
 #define SET 0x01
@@ -68,10 +74,102 @@
 #define HWQ 0x11
 #define HWI 0x12
 
+// Events
+#define N_EVENTS (MAX_DEVICES + 1)
+#define NO_EVENT 0xffffffffffffffffULL
+#define EVENT_CLOCK CLOCK
+#define EVENT_REPLAY MAX_DEVICES
+
+// Engines
+#define REFERENCE 0
+#define THREADED 1
+#define TRANSLATED 2
+
+// Translation
+#define HOT_COUNT 16
+#define MAX_BLOCK_LENGTH 64
+#define MAX_BLOCKS 4096
+#define MAX_OPERATIONS 65536
+
+// Pages
+#define PAGE_SIZE 512
+#define PAGE_SHIFT 9
+#define N_PAGES 128
+#define DIRTY_SNAPSHOT 0x01
+#define DIRTY_OBSERVER 0x02
+#define DIRTY_ALL 0xff
+
+// Debugger
+#define MAX_WATCHPOINTS 16
+#define WATCH_READ 0x01
+#define WATCH_WRITE 0x02
+#define STOP_BUDGET 0
+#define STOP_BRK 1
+#define STOP_BREAKPOINT 2
+#define STOP_WATCHPOINT 3
+#define HOOK_WATCH 0x01
+#define HOOK_TRACE 0x02
+#define HOOK_PROFILE 0x04
+#define HOOK_CALLS 0x08
+#define HOOK_IDLE 0x10
+#define NO_DST 0xffffffff
+#define LOAD(address) load_word(emulator, (address))
+#define BREAKPOINT(address) \
+    (emulator->breakpoints[(address) >> 3] & (1 << ((address) & 7)))
+
+// Call Graph
+#define MAX_CALL_DEPTH 256
+#define FRAME_INTERRUPT 0x10000
+
+// Idle Loops
+#define IDLE_WINDOW 16
+#define IDLE_STEPS 16
+#define MAX_IDLE_BACKOFF 1024
+
 // Hardware
-#define N_DEVICES 3
+#define MAX_DEVICES 16
+#define N_BUILTIN_DEVICES 3
 #define LEM 0
 #define KEYBOARD 1
 #define CLOCK 2
 
+// LEM
+#define LEM_WIDTH 128
+#define LEM_HEIGHT 96
+#define LEM_COLUMNS 32
+#define LEM_ROWS 12
+#define BLINK_RATE 50000
+
+// M35FD
+#define FLOPPY_SECTOR_SIZE 512
+#define FLOPPY_SECTORS_PER_TRACK 18
+#define FLOPPY_SIZE (1440 * FLOPPY_SECTOR_SIZE)
+#define FLOPPY_SEEK_CYCLES 240
+#define FLOPPY_TRANSFER_CYCLES (FLOPPY_SECTOR_SIZE * 100000 / 30700)
+#define FLOPPY_READ_ONLY 0
+#define FLOPPY_READ_WRITE 1
+#define FLOPPY_COPY_ON_WRITE 2
+#define FLOPPY_NO_MEDIA 0
+#define FLOPPY_READY 1
+#define FLOPPY_READY_WP 2
+#define FLOPPY_BUSY 3
+#define FLOPPY_ERROR_NONE 0
+#define FLOPPY_ERROR_BUSY 1
+#define FLOPPY_ERROR_NO_MEDIA 2
+#define FLOPPY_ERROR_PROTECTED 3
+#define FLOPPY_ERROR_EJECT 4
+#define FLOPPY_ERROR_BAD_SECTOR 5
+#define FLOPPY_READ 0
+#define FLOPPY_WRITE 1
+
+// Mailbox
+#define MAILBOX_SIZE 64
+#define MAILBOX_BROADCAST 0xffff
+#define DEFAULT_QUANTUM 1000
+
+// Input Replay
+#define INPUT_KEY_DOWN 1
+#define INPUT_KEY_UP 2
+#define INPUT_CHAR 3
+
 #endif
@@ -0,0 +1,46 @@
+#include "common.h"
+#include "emulator.h"
+#include "debugger.h"
+
+// Breakpoints
+void set_breakpoint(Emulator *emulator, unsigned short address,
+    unsigned int enabled) {
+    unsigned char mask = 1 << (address & 7);
+    unsigned char *byte = emulator->breakpoints + (address >> 3);
+    if (enabled && !(*byte & mask)) {
+        *byte |= mask;
+        emulator->n_breakpoints++;
+    }
+    if (!enabled && (*byte & mask)) {
+        *byte &= ~mask;
+        emulator->n_breakpoints--;
+    }
+}
+
+void clear_breakpoints(Emulator *emulator) {
+    for (unsigned int i = 0; i < SIZE / 8; i++) {
+        emulator->breakpoints[i] = 0;
+    }
+    emulator->n_breakpoints = 0;
+}
+
+// Watchpoints
+int add_watchpoint(Emulator *emulator, unsigned short start,
+    unsigned short end, unsigned char access) {
+    Watchpoint *w;
+    if (emulator->n_watchpoints == MAX_WATCHPOINTS || start > end ||
+        !access) {
+        return -1;
+    }
+    w = emulator->watchpoints + emulator->n_watchpoints;
+    w->start = start;
+    w->end = end;
+    w->access = access;
+    emulator->hooks |= HOOK_WATCH;
+    return emulator->n_watchpoints++;
+}
+
+void clear_watchpoints(Emulator *emulator) {
+    emulator->n_watchpoints = 0;
+    emulator->hooks &= ~HOOK_WATCH;
+}
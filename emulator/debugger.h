@@ -0,0 +1,16 @@
+#ifndef DEBUGGER_H
+#define DEBUGGER_H
+
+#include "emulator.h"
+
+void set_breakpoint(Emulator *emulator, unsigned short address,
+    unsigned int enabled);
+
+void clear_breakpoints(Emulator *emulator);
+
+int add_watchpoint(Emulator *emulator, unsigned short start,
+    unsigned short end, unsigned char access);
+
+void clear_watchpoints(Emulator *emulator);
+
+#endif
@@ -0,0 +1,82 @@
+#include "common.h"
+#include "emulator.h"
+#include "decoder.h"
+
+// Handler Tables
+static const unsigned char BASIC_HANDLERS[32] = {
+    [SET] = H_SET, [ADD] = H_ADD, [SUB] = H_SUB, [MUL] = H_MUL,
+    [MLI] = H_MLI, [DIV] = H_DIV, [DVI] = H_DVI, [MOD] = H_MOD,
+    [MDI] = H_MDI, [AND] = H_AND, [BOR] = H_BOR, [XOR] = H_XOR,
+    [SHR] = H_SHR, [ASR] = H_ASR, [SHL] = H_SHL, [IFB] = H_IFB,
+    [IFC] = H_IFC, [IFE] = H_IFE, [IFN] = H_IFN, [IFG] = H_IFG,
+    [IFA] = H_IFA, [IFL] = H_IFL, [IFU] = H_IFU, [ADX] = H_ADX,
+    [SUX] = H_SUX, [STI] = H_STI, [STD] = H_STD,
+};
+
+static const unsigned char SPECIAL_HANDLERS[32] = {
+    [JSR] = H_JSR, [BRK] = H_BRK, [INT] = H_INT, [IAG] = H_IAG,
+    [IAS] = H_IAS, [RFI] = H_RFI, [IAQ] = H_IAQ, [HWN] = H_HWN,
+    [HWQ] = H_HWQ, [HWI] = H_HWI,
+};
+
+static const unsigned char HANDLER_CYCLES[N_HANDLERS] = {
+    [H_NOP] = 1, [H_SET] = 1, [H_ADD] = 2, [H_SUB] = 2, [H_MUL] = 2,
+    [H_MLI] = 2, [H_DIV] = 3, [H_DVI] = 3, [H_MOD] = 3, [H_MDI] = 3,
+    [H_AND] = 1, [H_BOR] = 1, [H_XOR] = 1, [H_SHR] = 1, [H_ASR] = 1,
+    [H_SHL] = 1, [H_IFB] = 2, [H_IFC] = 2, [H_IFE] = 2, [H_IFN] = 2,
+    [H_IFG] = 2, [H_IFA] = 2, [H_IFL] = 2, [H_IFU] = 2, [H_ADX] = 3,
+    [H_SUX] = 3, [H_STI] = 2, [H_STD] = 2,
+    [H_SPECIAL_NOP] = 1, [H_JSR] = 3, [H_BRK] = 1, [H_INT] = 4,
+    [H_IAG] = 1, [H_IAS] = 1, [H_RFI] = 3, [H_IAQ] = 2, [H_HWN] = 2,
+    [H_HWQ] = 4, [H_HWI] = 4, [H_BACK] = 1,
+};
+
+// Decoding
+static unsigned char decode_operand(Emulator *emulator, Decoded *d,
+    unsigned short address, unsigned char x, unsigned short *word) {
+    if (NEXT_WORD(x)) {
+        *word = RAM((unsigned short)(address + d->size));
+        d->size++;
+        d->cycles++;
+        return x;
+    }
+    if (x >= 0x20) {
+        *word = x == 0x20 ? MAX_VALUE : x - 0x21;
+        return 0x1f;
+    }
+    *word = 0;
+    return x;
+}
+
+Decoded *decode(Emulator *emulator, unsigned short address) {
+    Decoded *d = emulator->decoded + address;
+    unsigned short word = RAM(address);
+    unsigned char op = word & 0x1f;
+    unsigned char dst = (word >> 5) & 0x1f;
+    unsigned char src = (word >> 10) & 0x3f;
+    d->size = 1;
+    d->cycles = 0;
+    d->dst = 0;
+    d->dst_word = 0;
+    if (op) {
+        d->handler = BASIC_HANDLERS[op];
+        d->src = decode_operand(emulator, d, address, src, &d->src_word);
+        d->dst = decode_operand(emulator, d, address, dst, &d->dst_word);
+        if (d->src == 0x1c && NEXT_WORD(dst)) {
+            d->src_word = 1;
+        }
+        if (is_back_jump(emulator, address)) {
+            d->handler = H_BACK;
+        }
+    }
+    else {
+        d->handler = SPECIAL_HANDLERS[dst];
+        if (!d->handler) {
+            d->handler = H_SPECIAL_NOP;
+        }
+        d->src = decode_operand(emulator, d, address, src, &d->src_word);
+    }
+    d->cycles += HANDLER_CYCLES[d->handler];
+    d->valid = 1;
+    return d;
+}
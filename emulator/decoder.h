@@ -0,0 +1,125 @@
+#ifndef DECODER_H
+#define DECODER_H
+
+#include "emulator.h"
+
+// Handlers
+enum {
+    H_NOP, H_SET, H_ADD, H_SUB, H_MUL, H_MLI, H_DIV, H_DVI, H_MOD, H_MDI,
+    H_AND, H_BOR, H_XOR, H_SHR, H_ASR, H_SHL, H_IFB, H_IFC, H_IFE, H_IFN,
+    H_IFG, H_IFA, H_IFL, H_IFU, H_ADX, H_SUX, H_STI, H_STD,
+    H_SPECIAL_NOP, H_JSR, H_BRK, H_INT, H_IAG, H_IAS, H_RFI, H_IAQ, H_HWN,
+    H_HWQ, H_HWI, H_BACK,
+    N_HANDLERS
+};
+
+#define NEXT_WORD(x) (((x) >= 0x10 && (x) <= 0x17) || (x) == 0x1a || \
+    (x) == 0x1e || (x) == 0x1f)
+#define IS_CONDITIONAL(handler) ((handler) >= H_IFB && (handler) <= H_IFU)
+
+// Idle Loops
+static inline int is_back_jump(Emulator *emulator, unsigned short address) {
+    unsigned short word = RAM(address);
+    unsigned short target;
+    if ((word & 0x3ff) != ((0x1c << 5) | SET)) {
+        return 0;
+    }
+    if (word >> 10 == 0x1f) {
+        target = RAM((address + 1) & MAX_VALUE);
+    }
+    else if (word >> 10 >= 0x20) {
+        target = ((word >> 10) - 0x21) & MAX_VALUE;
+    }
+    else {
+        return 0;
+    }
+    return target <= address && address - target < IDLE_WINDOW;
+}
+
+// Decoding
+Decoded *decode(Emulator *emulator, unsigned short address);
+
+static inline Decoded *fetch(Emulator *emulator) {
+    Decoded *d = emulator->decoded + PC;
+    return d->valid ? d : decode(emulator, PC);
+}
+
+// Operands
+static inline int value(Emulator *emulator, unsigned char x,
+    unsigned short word) {
+    switch (x) {
+        case 0x00: case 0x01: case 0x02: case 0x03:
+        case 0x04: case 0x05: case 0x06: case 0x07:
+            return REG(x);
+        case 0x08: case 0x09: case 0x0a: case 0x0b:
+        case 0x0c: case 0x0d: case 0x0e: case 0x0f:
+            return RAM(REG(x - 0x08));
+        case 0x10: case 0x11: case 0x12: case 0x13:
+        case 0x14: case 0x15: case 0x16: case 0x17:
+            return RAM((REG(x - 0x10) + word) % SIZE);
+        case 0x18:
+            return RAM(SP++);
+        case 0x19:
+            return RAM(SP);
+        case 0x1a:
+            return RAM((SP + word) % SIZE);
+        case 0x1b:
+            return SP;
+        case 0x1c:
+            return (PC - word) & MAX_VALUE;
+        case 0x1d:
+            return EX;
+        case 0x1e:
+            return RAM(word);
+        default:
+            return word;
+    }
+}
+
+static inline int address(Emulator *emulator, unsigned char x,
+    unsigned short word) {
+    switch (x) {
+        case 0x00: case 0x01: case 0x02: case 0x03:
+        case 0x04: case 0x05: case 0x06: case 0x07:
+            return REG_ADDR + x;
+        case 0x08: case 0x09: case 0x0a: case 0x0b:
+        case 0x0c: case 0x0d: case 0x0e: case 0x0f:
+            return REG(x - 0x08);
+        case 0x10: case 0x11: case 0x12: case 0x13:
+        case 0x14: case 0x15: case 0x16: case 0x17:
+            return (REG(x - 0x10) + word) % SIZE;
+        case 0x18:
+            return --SP;
+        case 0x19:
+            return SP;
+        case 0x1a:
+            return (SP + word) % SIZE;
+        case 0x1b:
+            return SP_ADDR;
+        case 0x1c:
+            return PC_ADDR;
+        case 0x1d:
+            return EX_ADDR;
+        case 0x1e:
+            return word;
+        default:
+            LT = word;
+            return LT_ADDR;
+    }
+}
+
+// Skipping
+static inline void skip(Emulator *emulator) {
+    while (SKIP) {
+        Decoded *d = fetch(emulator);
+        PC += d->size;
+        if (IS_CONDITIONAL(d->handler)) {
+            CYCLES(1);
+        }
+        else {
+            SKIP = 0;
+        }
+    }
+}
+
+#endif
@@ -0,0 +1,92 @@
+#include "common.h"
+#include "emulator.h"
+#include "devices.h"
+#include "lem.h"
+#include "keyboard.h"
+#include "clock.h"
+
+// Built-in Handlers
+static void lem_hwi(Emulator *emulator, void *state) {
+    (void)state;
+    on_lem(emulator);
+}
+
+static void keyboard_hwi(Emulator *emulator, void *state) {
+    (void)state;
+    on_keyboard(emulator);
+}
+
+static void clock_hwi(Emulator *emulator, void *state) {
+    (void)state;
+    on_clock(emulator);
+}
+
+static void clock_event(Emulator *emulator, void *state) {
+    (void)state;
+    on_clock_tick(emulator);
+}
+
+// Device Functions
+int attach_device(Emulator *emulator, unsigned int id,
+    unsigned int manufacturer, unsigned short version,
+    DeviceHandler on_hwi, DeviceHandler on_event, void *state) {
+    Device *device;
+    if (emulator->n_devices == MAX_DEVICES) {
+        return -1;
+    }
+    device = emulator->devices + emulator->n_devices;
+    device->id = id;
+    device->manufacturer = manufacturer;
+    device->version = version;
+    device->on_hwi = on_hwi;
+    device->on_event = on_event;
+    device->on_reset = 0;
+    device->on_save = 0;
+    device->on_restore = 0;
+    device->state = state;
+    device->save_size = 0;
+    return emulator->n_devices++;
+}
+
+void detach_device(Emulator *emulator, unsigned int index) {
+    Device *device = emulator->devices + index;
+    if (index < N_BUILTIN_DEVICES || index >= emulator->n_devices) {
+        return;
+    }
+    device->id = 0;
+    device->manufacturer = 0;
+    device->version = 0;
+    device->on_hwi = 0;
+    device->on_event = 0;
+    device->on_reset = 0;
+    device->on_save = 0;
+    device->on_restore = 0;
+    device->state = 0;
+    device->save_size = 0;
+    emulator->events[index] = NO_EVENT;
+    // Later devices keep their index, so only trailing slots are freed
+    while (emulator->n_devices > N_BUILTIN_DEVICES) {
+        device = emulator->devices + emulator->n_devices - 1;
+        if (device->id || device->on_hwi) {
+            break;
+        }
+        emulator->n_devices--;
+    }
+}
+
+void attach_builtin_devices(Emulator *emulator) {
+    emulator->n_devices = 0;
+    attach_device(emulator, 0x7349f615, 0x1c6c8b36, 0x1802,
+        lem_hwi, 0, 0);
+    attach_device(emulator, 0x30cf7406, 0x1c6c8b36, 0x0001,
+        keyboard_hwi, 0, 0);
+    attach_device(emulator, 0x12d0b402, 0x1c6c8b36, 0x0001,
+        clock_hwi, clock_event, 0);
+}
+
+void detach_devices(Emulator *emulator) {
+    for (unsigned int i = N_BUILTIN_DEVICES; i < emulator->n_devices; i++) {
+        emulator->events[i] = NO_EVENT;
+    }
+    attach_builtin_devices(emulator);
+}
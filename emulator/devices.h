@@ -0,0 +1,16 @@
+#ifndef DEVICES_H
+#define DEVICES_H
+
+#include "emulator.h"
+
+int attach_device(Emulator *emulator, unsigned int id,
+    unsigned int manufacturer, unsigned short version,
+    DeviceHandler on_hwi, DeviceHandler on_event, void *state);
+
+void detach_device(Emulator *emulator, unsigned int index);
+
+void attach_builtin_devices(Emulator *emulator);
+
+void detach_devices(Emulator *emulator);
+
+#endif
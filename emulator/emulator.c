@@ -1,8 +1,16 @@
+#include <stdlib.h>
 #include "common.h"
 #include "emulator.h"
-#include "lem.h"
-#include "keyboard.h"
-#include "clock.h"
+#include "decoder.h"
+#include "threaded.h"
+#include "translated.h"
+#include "snapshot.h"
+#include "trace.h"
+#include "profile.h"
+#include "callgraph.h"
+#include "idle.h"
+#include "devices.h"
+#include "replay.h"
 
 // Emulator Functions
 void reset(Emulator *emulator) {
@@ -13,30 +21,146 @@ void reset(Emulator *emulator) {
     SKIP = 0;
     HALT = 0;
     CYCLE = 0;
-    for (unsigned int i = 0; i < 256; i++) {
+    for (unsigned int i = 0; i < INTERRUPT_SIZE; i++) {
         emulator->interrupt_buffer[i] = 0;
     }
-    emulator->interrupt_index = 0;
+    emulator->interrupt_head = 0;
+    emulator->interrupt_count = 0;
     emulator->interrupt_queueing = 0;
+    emulator->interrupt_dropped = 0;
     // LEM
     emulator->lem_screen = 0;
     emulator->lem_font = 0;
     emulator->lem_palette = 0;
     emulator->lem_border = 0;
     // KEYBOARD
-    for (unsigned int i = 0; i < 16; i++) {
+    for (unsigned int i = 0; i < KEYBOARD_SIZE; i++) {
         emulator->keyboard_buffer[i] = 0;
     }
     for (unsigned int i = 0; i < 256; i++) {
         emulator->keyboard_pressed[i] = 0;
     }
-    emulator->keyboard_index = 0;
+    emulator->keyboard_head = 0;
+    emulator->keyboard_count = 0;
     emulator->keyboard_message = 0;
+    emulator->keyboard_dropped = 0;
     // CLOCK
     emulator->clock_cycle = 0;
     emulator->clock_rate = 0;
     emulator->clock_ticks = 0;
     emulator->clock_message = 0;
+    // EVENTS
+    emulator->event_cycle = NO_EVENT;
+    for (unsigned int i = 0; i < N_EVENTS; i++) {
+        emulator->events[i] = NO_EVENT;
+    }
+    // ENGINE
+    invalidate(emulator, 0, SIZE);
+    // CALL GRAPH
+    emulator->call_depth = 0;
+    // DEVICES
+    if (!emulator->n_devices) {
+        attach_builtin_devices(emulator);
+    }
+    for (unsigned int i = 0; i < emulator->n_devices; i++) {
+        Device *device = emulator->devices + i;
+        if (device->on_reset) {
+            device->on_reset(emulator, device->state);
+        }
+    }
+}
+
+void destroy(Emulator *emulator) {
+    set_engine(emulator, REFERENCE);
+    release_pages(emulator);
+    disable_trace(emulator);
+    disable_profile(emulator);
+    disable_call_graph(emulator);
+    stop_replay(emulator);
+}
+
+void set_engine(Emulator *emulator, unsigned short engine) {
+    if (engine != REFERENCE && !emulator->decoded) {
+        emulator->decoded = calloc(SIZE, sizeof(Decoded));
+    }
+    if (engine == TRANSLATED && emulator->decoded &&
+        !emulator->translation) {
+        emulator->translation = calloc(1, sizeof(Translation));
+    }
+    if (engine != TRANSLATED) {
+        free(emulator->translation);
+        emulator->translation = 0;
+    }
+    if (engine == REFERENCE) {
+        free(emulator->decoded);
+        emulator->decoded = 0;
+    }
+    if (engine == TRANSLATED && !emulator->translation) {
+        engine = THREADED;
+    }
+    emulator->engine = emulator->decoded ? engine : REFERENCE;
+}
+
+void invalidate(Emulator *emulator, unsigned int address,
+    unsigned int length) {
+    if (length > SIZE) {
+        length = SIZE;
+    }
+    for (unsigned int i = 0; i < length; i += PAGE_SIZE) {
+        emulator->dirty[((address + i) & MAX_VALUE) >> PAGE_SHIFT] =
+            DIRTY_ALL;
+    }
+    if (length) {
+        emulator->dirty[((address + length - 1) & MAX_VALUE) >> PAGE_SHIFT] =
+            DIRTY_ALL;
+    }
+    if (!emulator->decoded) {
+        return;
+    }
+    for (unsigned int i = 0; i < length + 2; i++) {
+        emulator->decoded[(address + i - 2) & MAX_VALUE].valid = 0;
+    }
+    if (emulator->translation) {
+        for (unsigned int i = 0; i < length; i++) {
+            if (emulator->translation->code[(address + i) & MAX_VALUE]) {
+                emulator->translation->flushed = 1;
+                break;
+            }
+        }
+    }
+}
+
+void on_store(Emulator *emulator, int address, unsigned short value) {
+    if (emulator->hooks & HOOK_WATCH) {
+        watch(emulator, address, WATCH_WRITE);
+    }
+    if ((emulator->hooks & HOOK_IDLE) && address < SIZE) {
+        emulator->idle_store = 1;
+    }
+    if (emulator->trace_record) {
+        emulator->trace_record->dst = address;
+        emulator->trace_record->value = value;
+        emulator->trace_record = 0;
+    }
+}
+
+unsigned int take_dirty(Emulator *emulator, unsigned int *ranges) {
+    unsigned int count = 0;
+    for (unsigned int i = 0; i < N_PAGES; i++) {
+        if (!(emulator->dirty[i] & DIRTY_OBSERVER)) {
+            continue;
+        }
+        emulator->dirty[i] &= ~DIRTY_OBSERVER;
+        if (count && ranges[count * 2 - 1] == i * PAGE_SIZE) {
+            ranges[count * 2 - 1] += PAGE_SIZE;
+        }
+        else {
+            ranges[count * 2] = i * PAGE_SIZE;
+            ranges[count * 2 + 1] = (i + 1) * PAGE_SIZE;
+            count++;
+        }
+    }
+    return count;
 }
 
 void load(Emulator *emulator, unsigned short *program, unsigned int length) {
@@ -46,14 +170,95 @@ void load(Emulator *emulator, unsigned short *program, unsigned int length) {
     for (unsigned int i = 0; i < length; i++) {
         RAM(i) = program[i];
     }
+    invalidate(emulator, 0, length);
+}
+
+void load_bytes(Emulator *emulator, unsigned char *data, unsigned int length,
+    unsigned short address) {
+    length /= 2;
+    if (length > (unsigned int)(SIZE - address)) {
+        length = SIZE - address;
+    }
+    for (unsigned int i = 0; i < length; i++) {
+        RAM(address + i) = (data[i * 2] << 8) | data[i * 2 + 1];
+    }
+    invalidate(emulator, address, length);
+}
+
+void dump_bytes(Emulator *emulator, unsigned char *data, unsigned int length,
+    unsigned short address) {
+    length /= 2;
+    if (length > (unsigned int)(SIZE - address)) {
+        length = SIZE - address;
+    }
+    for (unsigned int i = 0; i < length; i++) {
+        unsigned short word = RAM(address + i);
+        data[i * 2] = word >> 8;
+        data[i * 2 + 1] = word & 0xff;
+    }
 }
 
 void interrupt(Emulator *emulator, unsigned short message) {
-    if (emulator->interrupt_index < 256) {
-        emulator->interrupt_buffer[emulator->interrupt_index++] = message;
+    if (emulator->interrupt_count < INTERRUPT_SIZE) {
+        unsigned int tail =
+            emulator->interrupt_head + emulator->interrupt_count;
+        emulator->interrupt_buffer[tail % INTERRUPT_SIZE] = message;
+        emulator->interrupt_count++;
+        WAKE();
+    }
+    else {
+        emulator->interrupt_dropped++;
     }
 }
 
+void schedule(Emulator *emulator, unsigned int event,
+    unsigned long long int cycle) {
+    if (event >= N_EVENTS) {
+        return;
+    }
+    emulator->events[event] = cycle;
+    if (cycle < emulator->event_cycle) {
+        emulator->event_cycle = cycle;
+    }
+}
+
+void on_event(Emulator *emulator, unsigned int event) {
+    Device *device = emulator->devices + event;
+    if (event < emulator->n_devices && device->on_event) {
+        device->on_event(emulator, device->state);
+    }
+}
+
+void do_events(Emulator *emulator) {
+    unsigned long long int next = NO_EVENT;
+    for (unsigned int i = 0; i < MAX_DEVICES; i++) {
+        if (emulator->events[i] <= CYCLE) {
+            emulator->events[i] = NO_EVENT;
+            on_event(emulator, i);
+        }
+    }
+    if (!emulator->interrupt_queueing) {
+        do_interrupt(emulator);
+    }
+    // Replayed input lands after delivery, like input between runs
+    if (emulator->events[EVENT_REPLAY] <= CYCLE) {
+        emulator->events[EVENT_REPLAY] = NO_EVENT;
+        on_replay(emulator);
+    }
+    for (unsigned int i = 0; i < N_EVENTS; i++) {
+        if (emulator->events[i] < next) {
+            next = emulator->events[i];
+        }
+    }
+    if (emulator->interrupt_count && !emulator->interrupt_queueing) {
+        next = 0;
+    }
+    if (HALT) {
+        next = 0;
+    }
+    emulator->event_cycle = next;
+}
+
 int operand(Emulator *emulator, unsigned char x, unsigned char dereference) {
     int result;
     unsigned char literal = 0;
@@ -125,7 +330,7 @@ int operand(Emulator *emulator, unsigned char x, unsigned char dereference) {
         result = LT_ADDR;
     }
     if (dereference && !literal) {
-        result = RAM(result);
+        result = LOAD(result);
     }
     return result;
 }
@@ -157,100 +362,108 @@ void basic_instruction(Emulator *emulator, unsigned char opcode,
         }
         return;
     }
+    if ((emulator->hooks & HOOK_WATCH) && opcode != SET && opcode != STI &&
+        opcode != STD) {
+        watch(emulator, dst, WATCH_READ);
+    }
     switch (opcode) {
         case SET:
-            RAM(dst) = src;
+            STORE(dst, src);
+            if ((emulator->hooks & HOOK_CALLS) && op_dst == 0x1c &&
+                op_src == 0x18) {
+                leave_frame(emulator);
+            }
             CYCLES(1);
             break;
         case ADD:
             mod = divmod(ram + src, &quo);
             EX = quo ? 1 : 0;
-            RAM(dst) = mod;
+            STORE(dst, mod);
             CYCLES(2);
             break;
         case SUB:
             mod = divmod(ram - src, &quo);
             EX = quo ? MAX_VALUE : 0;
-            RAM(dst) = mod;
+            STORE(dst, mod);
             CYCLES(2);
             break;
         case MUL:
             mod = divmod(ram * src, &quo);
             EX = quo % SIZE;
-            RAM(dst) = mod;
+            STORE(dst, mod);
             CYCLES(2);
             break;
         case MLI:
             mod = divmod(sram * ssrc, &quo);
             EX = quo % SIZE;
-            RAM(dst) = mod;
+            STORE(dst, mod);
             CYCLES(2);
             break;
         case DIV:
             if (src) {
                 EX = ((ram << 16) / src) % SIZE;
-                RAM(dst) = (ram / src) % SIZE;
+                STORE(dst, (ram / src) % SIZE);
             }
             else {
                 EX = 0;
-                RAM(dst) = 0;
+                STORE(dst, 0);
             }
             CYCLES(3);
             break;
         case DVI:
             if (src) {
                 EX = ((sram << 16) / ssrc) % SIZE;
-                RAM(dst) = (sram / ssrc) % SIZE;
+                STORE(dst, (sram / ssrc) % SIZE);
             }
             else {
                 EX = 0;
-                RAM(dst) = 0;
+                STORE(dst, 0);
             }
             CYCLES(3);
             break;
         case MOD:
             if (src) {
-                RAM(dst) = (ram % src) % SIZE;
+                STORE(dst, (ram % src) % SIZE);
             }
             else {
-                RAM(dst) = 0;
+                STORE(dst, 0);
             }
             CYCLES(3);
             break;
         case MDI:
             if (src) {
-                RAM(dst) = (sram % ssrc) % SIZE;
+                STORE(dst, (sram % ssrc) % SIZE);
             }
             else {
-                RAM(dst) = 0;
+                STORE(dst, 0);
             }
             CYCLES(3);
             break;
         case AND:
-            RAM(dst) = (ram & src) % SIZE;
+            STORE(dst, (ram & src) % SIZE);
             CYCLES(1);
             break;
         case BOR:
-            RAM(dst) = (ram | src) % SIZE;
+            STORE(dst, (ram | src) % SIZE);
             CYCLES(1);
             break;
         case XOR:
-            RAM(dst) = (ram ^ src) % SIZE;
+            STORE(dst, (ram ^ src) % SIZE);
             CYCLES(1);
             break;
         case SHR:
             EX = ((ram << 16) >> src) % SIZE;
-            RAM(dst) = (ram >> src) % SIZE;
+            STORE(dst, (ram >> src) % SIZE);
             CYCLES(1);
             break;
         case ASR:
             EX = ((sram << 16) >> src) % SIZE;
-            RAM(dst) = (sram >> src) % SIZE;
+            STORE(dst, (sram >> src) % SIZE);
             CYCLES(1);
             break;
         case SHL:
             EX = ((ram << src) >> 16) % SIZE;
-            RAM(dst) = (ram << src) % SIZE;
+            STORE(dst, (ram << src) % SIZE);
             CYCLES(1);
             break;
         case IFB:
@@ -288,23 +501,23 @@ void basic_instruction(Emulator *emulator, unsigned char opcode,
         case ADX:
             mod = divmod(ram + src + EX, &quo);
             EX = quo ? 1 : 0;
-            RAM(dst) = mod;
+            STORE(dst, mod);
             CYCLES(3);
             break;
         case SUX:
             mod = divmod(ram - src + EX, &quo);
             EX = quo ? MAX_VALUE : 0;
-            RAM(dst) = mod;
+            STORE(dst, mod);
             CYCLES(3);
             break;
         case STI:
-            RAM(dst) = src;
+            STORE(dst, src);
             REG(6)++;
             REG(7)++;
             CYCLES(2);
             break;
         case STD:
-            RAM(dst) = src;
+            STORE(dst, src);
             REG(6)--;
             REG(7)--;
             CYCLES(2);
@@ -316,42 +529,29 @@ void basic_instruction(Emulator *emulator, unsigned char opcode,
 }
 
 void on_hwq(Emulator *emulator, unsigned short index) {
-    switch (index) {
-        case LEM:
-            REG(0) = 0xf615;
-            REG(1) = 0x7349;
-            REG(2) = 0x1802;
-            REG(3) = 0x8b36;
-            REG(4) = 0x1c6c;
-            break;
-        case KEYBOARD:
-            REG(0) = 0x7406;
-            REG(1) = 0x30cf;
-            REG(2) = 0x0001;
-            REG(3) = 0x8b36;
-            REG(4) = 0x1c6c;
-            break;
-        case CLOCK:
-            REG(0) = 0xb402;
-            REG(1) = 0x12d0;
-            REG(2) = 0x0001;
-            REG(3) = 0x8b36;
-            REG(4) = 0x1c6c;
-            break;
+    Device *device;
+    if (index >= emulator->n_devices) {
+        return;
     }
+    device = emulator->devices + index;
+    REG(0) = device->id & 0xffff;
+    REG(1) = device->id >> 16;
+    REG(2) = device->version;
+    REG(3) = device->manufacturer & 0xffff;
+    REG(4) = device->manufacturer >> 16;
 }
 
 void on_hwi(Emulator *emulator, unsigned short index) {
-    switch (index) {
-        case LEM:
-            on_lem(emulator);
-            break;
-        case KEYBOARD:
-            on_keyboard(emulator);
-            break;
-        case CLOCK:
-            on_clock(emulator);
-            break;
+    Device *device;
+    if (index >= emulator->n_devices) {
+        return;
+    }
+    device = emulator->devices + index;
+    if ((emulator->hooks & HOOK_IDLE) && index >= N_BUILTIN_DEVICES) {
+        emulator->idle_store = 1;
+    }
+    if (device->on_hwi) {
+        device->on_hwi(emulator, device->state);
     }
 }
 
@@ -363,14 +563,21 @@ void special_instruction(Emulator *emulator, unsigned char opcode,
         SKIP = 0;
         return;
     }
+    if ((emulator->hooks & HOOK_WATCH) && opcode != IAG && opcode != HWN) {
+        watch(emulator, dst, WATCH_READ);
+    }
     switch (opcode) {
         case JSR:
-            RAM(--SP) = PC;
+            STORE(--SP, PC);
+            if (emulator->hooks & HOOK_CALLS) {
+                enter_frame(emulator, PC - 1, ram, 0);
+            }
             PC = ram;
             CYCLES(3);
             break;
         case BRK:
             HALT = 1;
+            WAKE();
             CYCLES(1);
             break;
         case INT:
@@ -378,7 +585,7 @@ void special_instruction(Emulator *emulator, unsigned char opcode,
             CYCLES(4);
             break;
         case IAG:
-            RAM(dst) = IA;
+            STORE(dst, IA);
             CYCLES(1);
             break;
         case IAS:
@@ -387,16 +594,21 @@ void special_instruction(Emulator *emulator, unsigned char opcode,
             break;
         case RFI:
             emulator->interrupt_queueing = 0;
-            REG(0) = RAM(SP++);
-            PC = RAM(SP++);
+            WAKE();
+            REG(0) = LOAD(SP++);
+            PC = LOAD(SP++);
+            if (emulator->hooks & HOOK_CALLS) {
+                leave_frame(emulator);
+            }
             CYCLES(3);
             break;
         case IAQ:
             emulator->interrupt_queueing = ram;
+            WAKE();
             CYCLES(2);
             break;
         case HWN:
-            RAM(dst) = N_DEVICES;
+            STORE(dst, emulator->n_devices);
             CYCLES(2);
             break;
         case HWQ:
@@ -414,25 +626,26 @@ void special_instruction(Emulator *emulator, unsigned char opcode,
 }
 
 void do_interrupt(Emulator *emulator) {
-    if (emulator->interrupt_index) {
-        unsigned short message = emulator->interrupt_buffer[0];
-        for (unsigned int i = 1; i < 256; i++) {
-            emulator->interrupt_buffer[i - 1] =
-                emulator->interrupt_buffer[i];
-        }
-        emulator->interrupt_buffer[255] = 0;
-        emulator->interrupt_index--;
+    if (emulator->interrupt_count) {
+        unsigned short message =
+            emulator->interrupt_buffer[emulator->interrupt_head];
+        emulator->interrupt_head =
+            (emulator->interrupt_head + 1) % INTERRUPT_SIZE;
+        emulator->interrupt_count--;
         if (IA) {
             emulator->interrupt_queueing = 1;
-            RAM(--SP) = PC;
-            RAM(--SP) = REG(0);
+            STORE(--SP, PC);
+            STORE(--SP, REG(0));
+            if (emulator->hooks & HOOK_CALLS) {
+                enter_frame(emulator, PC, IA, FRAME_INTERRUPT);
+            }
             PC = IA;
             REG(0) = message;
         }
     }
 }
 
-void one_step(Emulator *emulator) {
+void execute(Emulator *emulator) {
     do {
         unsigned short word = RAM(PC++);
         unsigned char op = word & 0x1f;
@@ -445,27 +658,114 @@ void one_step(Emulator *emulator) {
             special_instruction(emulator, dst, src);
         }
     } while (SKIP);
-    on_clock_step(emulator);
-    if (!emulator->interrupt_queueing) {
-        do_interrupt(emulator);
+}
+
+static void step(Emulator *emulator) {
+    unsigned short pc = PC;
+    unsigned long long int cycle = CYCLE;
+    if (emulator->hooks & HOOK_TRACE) {
+        trace_instruction(emulator);
+    }
+    execute(emulator);
+    emulator->trace_record = 0;
+    if (emulator->hooks & HOOK_PROFILE) {
+        profile_instruction(emulator, pc, CYCLE - cycle);
+    }
+    if ((emulator->hooks & HOOK_CALLS) && CYCLE >= emulator->sample_cycle) {
+        sample_call_graph(emulator);
     }
 }
 
-void n_steps(Emulator *emulator, unsigned int steps) {
-    for (unsigned int i = 0; i < steps; i++) {
-        one_step(emulator);
-        if (HALT) {
-            break;
+void one_step(Emulator *emulator) {
+    step(emulator);
+    if (CYCLE >= emulator->event_cycle) {
+        do_events(emulator);
+    }
+}
+
+static void run(Emulator *emulator, unsigned long long int limit,
+    unsigned int steps) {
+    if (HALT) {
+        WAKE();
+    }
+    for (unsigned int i = 0; i < steps && CYCLE < limit; i++) {
+        unsigned short pc = PC;
+        execute(emulator);
+        if (PC <= pc && pc - PC < IDLE_WINDOW && is_back_jump(emulator, pc)) {
+            unsigned int remaining = steps - i;
+            fast_forward(emulator, limit, &remaining);
+            i = steps - remaining;
+        }
+        if (CYCLE >= emulator->event_cycle) {
+            do_events(emulator);
+            if (HALT) {
+                break;
+            }
         }
     }
 }
 
-void n_cycles(Emulator *emulator, unsigned int cycles) {
-    unsigned long long int cycle = CYCLE + cycles;
-    while (CYCLE < cycle) {
-        one_step(emulator);
-        if (HALT) {
+static unsigned int run_checked(Emulator *emulator,
+    unsigned long long int limit, unsigned int steps) {
+    emulator->stop = STOP_BUDGET;
+    if (HALT) {
+        WAKE();
+    }
+    for (unsigned int i = 0; i < steps && CYCLE < limit; i++) {
+        if (i && emulator->n_breakpoints && BREAKPOINT(PC)) {
+            emulator->stop = STOP_BREAKPOINT;
+            emulator->stop_address = PC;
             break;
         }
+        step(emulator);
+        if (CYCLE >= emulator->event_cycle) {
+            do_events(emulator);
+            if (HALT) {
+                emulator->stop = STOP_BRK;
+                break;
+            }
+        }
+        if (emulator->stop) {
+            break;
+        }
+    }
+    return emulator->stop;
+}
+
+static int checked(Emulator *emulator) {
+    return emulator->n_breakpoints || emulator->hooks;
+}
+
+unsigned int n_steps(Emulator *emulator, unsigned int steps) {
+    if (checked(emulator)) {
+        return run_checked(emulator, ~0ULL, steps);
+    }
+    if (emulator->engine == THREADED) {
+        threaded_n_steps(emulator, steps);
+    }
+    else if (emulator->engine == TRANSLATED) {
+        translated_n_steps(emulator, steps);
+    }
+    else {
+        run(emulator, ~0ULL, steps);
+    }
+    emulator->stop = HALT ? STOP_BRK : STOP_BUDGET;
+    return emulator->stop;
+}
+
+unsigned int n_cycles(Emulator *emulator, unsigned int cycles) {
+    if (checked(emulator)) {
+        return run_checked(emulator, CYCLE + cycles, cycles);
+    }
+    if (emulator->engine == THREADED) {
+        threaded_n_cycles(emulator, cycles);
+    }
+    else if (emulator->engine == TRANSLATED) {
+        translated_n_cycles(emulator, cycles);
+    }
+    else {
+        run(emulator, CYCLE + cycles, cycles);
     }
+    emulator->stop = HALT ? STOP_BRK : STOP_BUDGET;
+    return emulator->stop;
 }
@@ -1,40 +1,263 @@
 #ifndef EMULATOR_H
 #define EMULATOR_H
 
-// Emulator State
+// Predecoded Instruction
+typedef struct {
+    unsigned char handler;
+    unsigned char valid;
+    unsigned char size;
+    unsigned char cycles;
+    unsigned char dst;
+    unsigned char src;
+    unsigned short dst_word;
+    unsigned short src_word;
+} Decoded;
+
+// Translated Operation
+typedef struct {
+    unsigned char handler;
+    unsigned char cycles;
+    unsigned char dst;
+    unsigned char src;
+    unsigned short dst_word;
+    unsigned short src_word;
+    unsigned short literal;
+    unsigned short next;
+    int address;
+    unsigned short *value;
+} Operation;
+
+// Translated Block
+typedef struct {
+    Operation *operations;
+    unsigned short address;
+    unsigned short end;
+    unsigned short length;
+    unsigned short cycles;
+} Block;
+
+// Translation Cache
+typedef struct {
+    Block *entries[SIZE];
+    unsigned short counts[SIZE];
+    unsigned char code[SIZE];
+    Block blocks[MAX_BLOCKS];
+    Operation operations[MAX_OPERATIONS];
+    unsigned int n_blocks;
+    unsigned int n_operations;
+    unsigned int flushed;
+} Translation;
+
+// Shared RAM Page
+typedef struct {
+    unsigned short ram[PAGE_SIZE];
+    unsigned int references;
+} Page;
+
+// Watchpoint
+typedef struct {
+    unsigned short start;
+    unsigned short end;
+    unsigned char access;
+} Watchpoint;
+
+// Trace Record
+typedef struct {
+    unsigned long long int cycle;
+    unsigned int dst;
+    unsigned short pc;
+    unsigned short word;
+    unsigned short value;
+} TraceRecord;
+
+// Input Record
 typedef struct {
+    unsigned long long int cycle;
+    unsigned char type;
+    unsigned char key;
+} InputRecord;
+
+// Hardware Device
+typedef struct Emulator Emulator;
+
+typedef void (*DeviceHandler)(Emulator *emulator, void *state);
+
+typedef void (*DeviceSaver)(Emulator *emulator, void *state, void *data);
+
+typedef struct {
+    unsigned int id;
+    unsigned int manufacturer;
+    unsigned short version;
+    DeviceHandler on_hwi;
+    DeviceHandler on_event;
+    DeviceHandler on_reset;
+    DeviceSaver on_save;
+    DeviceSaver on_restore;
+    void *state;
+    unsigned int save_size;
+} Device;
+
+// Emulator State
+struct Emulator {
     // DCPU-16
     unsigned short ram[EXT_SIZE];
     unsigned short skip;
     unsigned short halt;
     unsigned long long int cycle;
-    unsigned short interrupt_buffer[256];
-    unsigned short interrupt_index;
+    unsigned short interrupt_buffer[INTERRUPT_SIZE];
+    unsigned short interrupt_head;
+    unsigned short interrupt_count;
     unsigned short interrupt_queueing;
+    unsigned int interrupt_dropped;
     // LEM
     unsigned short lem_screen;
     unsigned short lem_font;
     unsigned short lem_palette;
     unsigned short lem_border;
     // KEYBOARD
-    unsigned char keyboard_buffer[16];
+    unsigned char keyboard_buffer[KEYBOARD_SIZE];
     unsigned char keyboard_pressed[256];
-    unsigned short keyboard_index;
+    unsigned short keyboard_head;
+    unsigned short keyboard_count;
     unsigned short keyboard_message;
+    unsigned int keyboard_dropped;
     // CLOCK
     unsigned long long int clock_cycle;
     unsigned short clock_rate;
     unsigned short clock_ticks;
     unsigned short clock_message;
-} Emulator;
+    // EVENTS
+    unsigned long long int event_cycle;
+    unsigned long long int events[N_EVENTS];
+    // ENGINE
+    unsigned short engine;
+    Decoded *decoded;
+    Translation *translation;
+    // PAGES
+    unsigned char dirty[N_PAGES];
+    Page **pages;
+    // DEBUGGER
+    unsigned char breakpoints[SIZE / 8];
+    Watchpoint watchpoints[MAX_WATCHPOINTS];
+    unsigned int n_breakpoints;
+    unsigned int n_watchpoints;
+    unsigned short stop;
+    unsigned short stop_address;
+    unsigned short hooks;
+    // TRACE
+    TraceRecord *trace;
+    TraceRecord *trace_record;
+    unsigned int trace_capacity;
+    unsigned int trace_head;
+    unsigned int trace_count;
+    // PROFILE
+    unsigned long long int *profile_cycles;
+    unsigned int *profile_counts;
+    // CALL GRAPH
+    unsigned int *call_stack;
+    unsigned short *call_sites;
+    unsigned int call_depth;
+    unsigned int *samples;
+    unsigned int sample_capacity;
+    unsigned int sample_size;
+    unsigned int samples_dropped;
+    unsigned int sample_period;
+    unsigned long long int sample_cycle;
+    // IDLE
+    unsigned short idle_head;
+    unsigned short idle_store;
+    unsigned int idle_wait;
+    unsigned int idle_backoff;
+    // DEVICES
+    Device devices[MAX_DEVICES];
+    unsigned int n_devices;
+    // REPLAY
+    InputRecord *replay;
+    unsigned int replay_count;
+    unsigned int replay_next;
+};
+
+// Watchpoints
+static inline void watch(Emulator *emulator, int address,
+    unsigned char access) {
+    if (address >= SIZE || SKIP || emulator->stop) {
+        return;
+    }
+    for (unsigned int i = 0; i < emulator->n_watchpoints; i++) {
+        Watchpoint *w = emulator->watchpoints + i;
+        if ((w->access & access) && address >= w->start &&
+            address <= w->end) {
+            emulator->stop = STOP_WATCHPOINT;
+            emulator->stop_address = address;
+            return;
+        }
+    }
+}
+
+// Memory Reads
+static inline unsigned short load_word(Emulator *emulator, int address) {
+    if (emulator->hooks & HOOK_WATCH) {
+        watch(emulator, address, WATCH_READ);
+    }
+    return RAM(address);
+}
+
+// Memory Writes
+void on_store(Emulator *emulator, int address, unsigned short value);
+
+static inline void unchecked_store(Emulator *emulator, int address,
+    unsigned short value) {
+    RAM(address) = value;
+    if (address < SIZE) {
+        emulator->dirty[address >> PAGE_SHIFT] = DIRTY_ALL;
+    }
+    if (address < SIZE && emulator->decoded) {
+        emulator->decoded[address].valid = 0;
+        emulator->decoded[(address - 1) & MAX_VALUE].valid = 0;
+        emulator->decoded[(address - 2) & MAX_VALUE].valid = 0;
+        if (emulator->translation && emulator->translation->code[address]) {
+            emulator->translation->flushed = 1;
+        }
+    }
+}
+
+static inline void store(Emulator *emulator, int address,
+    unsigned short value) {
+    unchecked_store(emulator, address, value);
+    if (emulator->hooks) {
+        on_store(emulator, address, value);
+    }
+}
 
 // Emulator Functions
 void reset(Emulator *emulator);
 
+void destroy(Emulator *emulator);
+
+void set_engine(Emulator *emulator, unsigned short engine);
+
+void invalidate(Emulator *emulator, unsigned int address,
+    unsigned int length);
+
+unsigned int take_dirty(Emulator *emulator, unsigned int *ranges);
+
 void load(Emulator *emulator, unsigned short *program, unsigned int length);
 
+void load_bytes(Emulator *emulator, unsigned char *data, unsigned int length,
+    unsigned short address);
+
+void dump_bytes(Emulator *emulator, unsigned char *data, unsigned int length,
+    unsigned short address);
+
 void interrupt(Emulator *emulator, unsigned short message);
 
+void schedule(Emulator *emulator, unsigned int event,
+    unsigned long long int cycle);
+
+void on_event(Emulator *emulator, unsigned int event);
+
+void do_events(Emulator *emulator);
+
 int operand(Emulator *emulator, unsigned char x, unsigned char dereference);
 
 int divmod(int x, int *quo);
@@ -51,10 +274,12 @@ void special_instruction(Emulator *emulator, unsigned char opcode,
 
 void do_interrupt(Emulator *emulator);
 
-void step(Emulator *emulator);
+void execute(Emulator *emulator);
+
+void one_step(Emulator *emulator);
 
-void n_steps(Emulator *emulator, unsigned int steps);
+unsigned int n_steps(Emulator *emulator, unsigned int steps);
 
-void n_cycles(Emulator *emulator, unsigned int cycles);
+unsigned int n_cycles(Emulator *emulator, unsigned int cycles);
 
 #endif
@@ -0,0 +1,307 @@
+#ifndef _WIN32
+#define _POSIX_C_SOURCE 200112L
+#endif
+#include <stdlib.h>
+#ifdef _WIN32
+#include <windows.h>
+#else
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
+#include "common.h"
+#include "emulator.h"
+#include "devices.h"
+#include "floppy.h"
+
+// Disk Images
+static int map_disk(Floppy *floppy, const char *path, unsigned int mode) {
+    size_t size;
+#ifdef _WIN32
+    HANDLE file, mapping;
+    LARGE_INTEGER length;
+    DWORD access = mode == FLOPPY_READ_WRITE ?
+        GENERIC_READ | GENERIC_WRITE : GENERIC_READ;
+    DWORD protect = mode == FLOPPY_READ_WRITE ? PAGE_READWRITE :
+        mode == FLOPPY_COPY_ON_WRITE ? PAGE_WRITECOPY : PAGE_READONLY;
+    DWORD view = mode == FLOPPY_READ_WRITE ? FILE_MAP_WRITE :
+        mode == FLOPPY_COPY_ON_WRITE ? FILE_MAP_COPY : FILE_MAP_READ;
+    file = CreateFileA(path, access, FILE_SHARE_READ | FILE_SHARE_WRITE, 0,
+        mode == FLOPPY_READ_WRITE ? OPEN_ALWAYS : OPEN_EXISTING,
+        FILE_ATTRIBUTE_NORMAL, 0);
+    if (file == INVALID_HANDLE_VALUE) {
+        return 0;
+    }
+    GetFileSizeEx(file, &length);
+    size = (size_t)length.QuadPart;
+    if (mode == FLOPPY_READ_WRITE && size < FLOPPY_SIZE * 2) {
+        size = FLOPPY_SIZE * 2;
+    }
+    if (size > FLOPPY_SIZE * 2) {
+        size = FLOPPY_SIZE * 2;
+    }
+    if (size < FLOPPY_SECTOR_SIZE * 2) {
+        CloseHandle(file);
+        return 0;
+    }
+    mapping = CreateFileMappingA(file, 0, protect, 0, (DWORD)size, 0);
+    CloseHandle(file);
+    if (!mapping) {
+        return 0;
+    }
+    floppy->data = MapViewOfFile(mapping, view, 0, 0, size);
+    if (!floppy->data) {
+        CloseHandle(mapping);
+        return 0;
+    }
+    floppy->mapping = mapping;
+#else
+    struct stat info;
+    int fd = open(path, mode == FLOPPY_READ_WRITE ? O_RDWR | O_CREAT :
+        O_RDONLY, 0666);
+    if (fd < 0) {
+        return 0;
+    }
+    if (fstat(fd, &info) < 0) {
+        close(fd);
+        return 0;
+    }
+    size = info.st_size;
+    if (mode == FLOPPY_READ_WRITE && size < FLOPPY_SIZE * 2) {
+        size = FLOPPY_SIZE * 2;
+        if (ftruncate(fd, size) < 0) {
+            close(fd);
+            return 0;
+        }
+    }
+    if (size > FLOPPY_SIZE * 2) {
+        size = FLOPPY_SIZE * 2;
+    }
+    if (size < FLOPPY_SECTOR_SIZE * 2) {
+        close(fd);
+        return 0;
+    }
+    floppy->data = mmap(0, size,
+        mode == FLOPPY_READ_ONLY ? PROT_READ : PROT_READ | PROT_WRITE,
+        mode == FLOPPY_READ_WRITE ? MAP_SHARED : MAP_PRIVATE, fd, 0);
+    close(fd);
+    if (floppy->data == MAP_FAILED) {
+        floppy->data = 0;
+        return 0;
+    }
+#endif
+    floppy->size = size;
+    floppy->sectors = size / (FLOPPY_SECTOR_SIZE * 2);
+    return 1;
+}
+
+static void unmap_disk(Floppy *floppy) {
+    if (!floppy->data) {
+        return;
+    }
+#ifdef _WIN32
+    UnmapViewOfFile(floppy->data);
+    CloseHandle(floppy->mapping);
+#else
+    munmap(floppy->data, floppy->size);
+#endif
+    floppy->data = 0;
+    floppy->size = 0;
+    floppy->sectors = 0;
+}
+
+// Status
+static void set_status(Emulator *emulator, Floppy *floppy,
+    unsigned short state, unsigned short error) {
+    int changed = state != floppy->state || error != floppy->error;
+    floppy->state = state;
+    floppy->error = error;
+    if (changed && floppy->message) {
+        interrupt(emulator, floppy->message);
+    }
+}
+
+static unsigned short ready_state(Floppy *floppy) {
+    if (!floppy->data) {
+        return FLOPPY_NO_MEDIA;
+    }
+    return floppy->mode == FLOPPY_READ_ONLY ?
+        FLOPPY_READY_WP : FLOPPY_READY;
+}
+
+// Transfers
+static void transfer(Emulator *emulator, Floppy *floppy) {
+    unsigned char *sector = (unsigned char *)floppy->data +
+        floppy->sector * FLOPPY_SECTOR_SIZE * 2;
+    unsigned short address = floppy->address;
+    for (unsigned int i = 0; i < FLOPPY_SECTOR_SIZE; i++, address++) {
+        unsigned char *word = sector + i * 2;
+        if (floppy->operation == FLOPPY_READ) {
+            RAM(address) = (word[0] << 8) | word[1];
+        }
+        else {
+            word[0] = RAM(address) >> 8;
+            word[1] = RAM(address) & 0xff;
+        }
+    }
+    if (floppy->operation == FLOPPY_READ) {
+        invalidate(emulator, floppy->address, FLOPPY_SECTOR_SIZE);
+    }
+}
+
+static int start(Emulator *emulator, Floppy *floppy,
+    unsigned short operation) {
+    unsigned short sector = REG(3);
+    unsigned short track = sector / FLOPPY_SECTORS_PER_TRACK;
+    unsigned int distance;
+    if (floppy->state == FLOPPY_NO_MEDIA) {
+        set_status(emulator, floppy, floppy->state, FLOPPY_ERROR_NO_MEDIA);
+        return 0;
+    }
+    if (floppy->state == FLOPPY_BUSY) {
+        set_status(emulator, floppy, floppy->state, FLOPPY_ERROR_BUSY);
+        return 0;
+    }
+    if (operation == FLOPPY_WRITE && floppy->state == FLOPPY_READY_WP) {
+        set_status(emulator, floppy, floppy->state, FLOPPY_ERROR_PROTECTED);
+        return 0;
+    }
+    if (sector >= floppy->sectors) {
+        set_status(emulator, floppy, floppy->state,
+            FLOPPY_ERROR_BAD_SECTOR);
+        return 0;
+    }
+    distance = track > floppy->track ?
+        track - floppy->track : floppy->track - track;
+    floppy->operation = operation;
+    floppy->sector = sector;
+    floppy->address = REG(4);
+    floppy->track = track;
+    schedule(emulator, floppy->index, CYCLE +
+        distance * FLOPPY_SEEK_CYCLES + FLOPPY_TRANSFER_CYCLES);
+    set_status(emulator, floppy, FLOPPY_BUSY, floppy->error);
+    return 1;
+}
+
+// Handlers
+static void on_floppy(Emulator *emulator, void *state) {
+    Floppy *floppy = state;
+    switch (REG(0)) {
+        case 0: // POLL_DEVICE
+            REG(1) = floppy->state;
+            REG(2) = floppy->error;
+            floppy->error = FLOPPY_ERROR_NONE;
+            break;
+        case 1: // SET_INTERRUPT
+            floppy->message = REG(3);
+            break;
+        case 2: // READ_SECTOR
+            REG(1) = start(emulator, floppy, FLOPPY_READ);
+            break;
+        case 3: // WRITE_SECTOR
+            REG(1) = start(emulator, floppy, FLOPPY_WRITE);
+            break;
+    }
+}
+
+static void on_floppy_event(Emulator *emulator, void *state) {
+    Floppy *floppy = state;
+    if (floppy->state != FLOPPY_BUSY) {
+        return;
+    }
+    transfer(emulator, floppy);
+    set_status(emulator, floppy, ready_state(floppy), floppy->error);
+}
+
+static void on_floppy_reset(Emulator *emulator, void *state) {
+    Floppy *floppy = state;
+    (void)emulator;
+    floppy->state = ready_state(floppy);
+    floppy->error = FLOPPY_ERROR_NONE;
+    floppy->message = 0;
+    floppy->operation = 0;
+}
+
+static void on_floppy_save(Emulator *emulator, void *state, void *data) {
+    Floppy *floppy = state;
+    FloppyState *saved = data;
+    (void)emulator;
+    saved->state = floppy->state;
+    saved->error = floppy->error;
+    saved->message = floppy->message;
+    saved->track = floppy->track;
+    saved->operation = floppy->operation;
+    saved->sector = floppy->sector;
+    saved->address = floppy->address;
+}
+
+static void on_floppy_restore(Emulator *emulator, void *state, void *data) {
+    Floppy *floppy = state;
+    FloppyState *saved = data;
+    floppy->error = saved->error;
+    floppy->message = saved->message;
+    floppy->track = saved->track;
+    floppy->operation = saved->operation;
+    floppy->sector = saved->sector;
+    floppy->address = saved->address;
+    // The disk may have been swapped since the snapshot
+    if (saved->state == FLOPPY_BUSY && floppy->sector < floppy->sectors) {
+        floppy->state = FLOPPY_BUSY;
+    }
+    else {
+        floppy->state = ready_state(floppy);
+        emulator->events[floppy->index] = NO_EVENT;
+    }
+}
+
+// Floppy Functions
+Floppy *attach_floppy(Emulator *emulator) {
+    Floppy *floppy = calloc(1, sizeof(Floppy));
+    int index;
+    if (!floppy) {
+        return 0;
+    }
+    index = attach_device(emulator, 0x4fd524c5, 0x1eb37e91, 0x000b,
+        on_floppy, on_floppy_event, floppy);
+    if (index < 0) {
+        free(floppy);
+        return 0;
+    }
+    emulator->devices[index].on_reset = on_floppy_reset;
+    emulator->devices[index].on_save = on_floppy_save;
+    emulator->devices[index].on_restore = on_floppy_restore;
+    emulator->devices[index].save_size = sizeof(FloppyState);
+    floppy->index = index;
+    floppy->state = FLOPPY_NO_MEDIA;
+    return floppy;
+}
+
+int insert_disk(Emulator *emulator, Floppy *floppy, const char *path,
+    unsigned int mode) {
+    eject_disk(emulator, floppy);
+    if (!map_disk(floppy, path, mode)) {
+        return 0;
+    }
+    floppy->mode = mode;
+    set_status(emulator, floppy, ready_state(floppy), floppy->error);
+    return 1;
+}
+
+void eject_disk(Emulator *emulator, Floppy *floppy) {
+    unsigned short error = floppy->error;
+    if (!floppy->data) {
+        return;
+    }
+    if (floppy->state == FLOPPY_BUSY) {
+        emulator->events[floppy->index] = NO_EVENT;
+        error = FLOPPY_ERROR_EJECT;
+    }
+    unmap_disk(floppy);
+    set_status(emulator, floppy, FLOPPY_NO_MEDIA, error);
+}
+
+void release_floppy(Floppy *floppy) {
+    unmap_disk(floppy);
+    free(floppy);
+}
@@ -0,0 +1,46 @@
+#ifndef FLOPPY_H
+#define FLOPPY_H
+
+#include <stddef.h>
+#include "emulator.h"
+
+// M35FD Saved State
+typedef struct {
+    unsigned short state;
+    unsigned short error;
+    unsigned short message;
+    unsigned short track;
+    unsigned short operation;
+    unsigned short sector;
+    unsigned short address;
+} FloppyState;
+
+// M35FD Drive
+typedef struct {
+    void *data;
+    size_t size;
+    unsigned int sectors;
+    unsigned int index;
+    unsigned short mode;
+    unsigned short state;
+    unsigned short error;
+    unsigned short message;
+    unsigned short track;
+    unsigned short operation;
+    unsigned short sector;
+    unsigned short address;
+#ifdef _WIN32
+    void *mapping;
+#endif
+} Floppy;
+
+Floppy *attach_floppy(Emulator *emulator);
+
+int insert_disk(Emulator *emulator, Floppy *floppy, const char *path,
+    unsigned int mode);
+
+void eject_disk(Emulator *emulator, Floppy *floppy);
+
+void release_floppy(Floppy *floppy);
+
+#endif
@@ -0,0 +1,73 @@
+#include <stddef.h>
+#include <string.h>
+#include "common.h"
+#include "emulator.h"
+#include "idle.h"
+
+// Idle State
+#define STATE_START offsetof(Emulator, interrupt_buffer)
+#define STATE_SIZE (offsetof(Emulator, engine) - STATE_START)
+#define STATE(emulator) ((unsigned char *)(emulator) + STATE_START)
+
+static void back_off(Emulator *emulator) {
+    emulator->idle_backoff = emulator->idle_backoff ?
+        emulator->idle_backoff * 2 : 1;
+    if (emulator->idle_backoff > MAX_IDLE_BACKOFF) {
+        emulator->idle_backoff = MAX_IDLE_BACKOFF;
+    }
+    emulator->idle_wait = emulator->idle_backoff;
+}
+
+// Idle Functions
+void fast_forward(Emulator *emulator, unsigned long long int limit,
+    unsigned int *steps) {
+    unsigned short head = PC;
+    unsigned short skip = SKIP;
+    unsigned short halt = HALT;
+    unsigned short registers[EXT_SIZE - SIZE];
+    unsigned char state[STATE_SIZE];
+    unsigned long long int start = CYCLE;
+    unsigned long long int bound, count;
+    unsigned int n = 0;
+    if (SKIP || HALT || *steps <= IDLE_STEPS + 1 ||
+        CYCLE >= emulator->event_cycle || CYCLE >= limit) {
+        return;
+    }
+    if (head != emulator->idle_head) {
+        emulator->idle_head = head;
+        emulator->idle_backoff = 0;
+        emulator->idle_wait = 0;
+    }
+    if (emulator->idle_wait) {
+        emulator->idle_wait--;
+        return;
+    }
+    memcpy(registers, &RAM(SIZE), sizeof(registers));
+    memcpy(state, STATE(emulator), STATE_SIZE);
+    emulator->idle_store = 0;
+    emulator->hooks |= HOOK_IDLE;
+    do {
+        execute(emulator);
+        n++;
+    } while (PC != head && n < IDLE_STEPS &&
+        CYCLE < emulator->event_cycle && CYCLE < limit);
+    emulator->hooks &= ~HOOK_IDLE;
+    *steps -= n;
+    if (PC != head || emulator->idle_store || SKIP != skip ||
+        HALT != halt || memcmp(registers, &RAM(SIZE), sizeof(registers)) ||
+        memcmp(state, STATE(emulator), STATE_SIZE)) {
+        back_off(emulator);
+        return;
+    }
+    emulator->idle_backoff = 0;
+    bound = limit < emulator->event_cycle ? limit : emulator->event_cycle;
+    if (CYCLE >= bound) {
+        return;
+    }
+    count = (bound - CYCLE) / (CYCLE - start);
+    if (count > (*steps - 1) / n) {
+        count = (*steps - 1) / n;
+    }
+    CYCLES(count * (CYCLE - start));
+    *steps -= count * n;
+}
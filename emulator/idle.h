@@ -0,0 +1,9 @@
+#ifndef IDLE_H
+#define IDLE_H
+
+#include "emulator.h"
+
+void fast_forward(Emulator *emulator, unsigned long long int limit,
+    unsigned int *steps);
+
+#endif
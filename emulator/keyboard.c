@@ -17,31 +17,31 @@ void on_key_up(Emulator *emulator, unsigned char key) {
 }
 
 void on_char(Emulator *emulator, unsigned char key) {
-    if (emulator->keyboard_index < 16) {
-        emulator->keyboard_buffer[emulator->keyboard_index++] = key;
+    if (emulator->keyboard_count < KEYBOARD_SIZE) {
+        unsigned int tail = emulator->keyboard_head + emulator->keyboard_count;
+        emulator->keyboard_buffer[tail % KEYBOARD_SIZE] = key;
+        emulator->keyboard_count++;
         if (emulator->keyboard_message) {
             interrupt(emulator, emulator->keyboard_message);
         }
     }
+    else {
+        emulator->keyboard_dropped++;
+    }
 }
 
 void on_keyboard(Emulator *emulator) {
     switch (REG(0)) {
         case 0: // CLEAR_BUFFER
-            for (unsigned int i = 0; i < 16; i++) {
-                emulator->keyboard_buffer[i] = 0;
-            }
-            emulator->keyboard_index = 0;
+            emulator->keyboard_head = 0;
+            emulator->keyboard_count = 0;
             break;
         case 1: // GET_CHARACTER
-            if (emulator->keyboard_index) {
-                REG(2) = emulator->keyboard_buffer[0];
-                for (unsigned int i = 1; i < 16; i++) {
-                    emulator->keyboard_buffer[i - 1] =
-                        emulator->keyboard_buffer[i];
-                }
-                emulator->keyboard_buffer[15] = 0;
-                emulator->keyboard_index--;
+            if (emulator->keyboard_count) {
+                REG(2) = emulator->keyboard_buffer[emulator->keyboard_head];
+                emulator->keyboard_head =
+                    (emulator->keyboard_head + 1) % KEYBOARD_SIZE;
+                emulator->keyboard_count--;
             }
             else {
                 REG(2) = 0;
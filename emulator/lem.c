@@ -44,6 +44,76 @@ unsigned short LEM_PALETTE[] = {
     0x0555, 0x055f, 0x05f5, 0x05ff, 0x0f55, 0x0f5f, 0x0ff5, 0x0fff,
 };
 
+// Rendering
+static unsigned short font_word(Emulator *emulator, unsigned int index) {
+    if (emulator->lem_font) {
+        return RAM((emulator->lem_font + index) & MAX_VALUE);
+    }
+    return LEM_FONT[index];
+}
+
+static unsigned short palette_word(Emulator *emulator, unsigned int index) {
+    if (emulator->lem_palette) {
+        return RAM((emulator->lem_palette + index) & MAX_VALUE);
+    }
+    return LEM_PALETTE[index];
+}
+
+static void put_pixel(unsigned char *pixels, unsigned int index,
+    unsigned short *palette, unsigned char color, unsigned int rgb) {
+    if (rgb) {
+        unsigned short value = palette[color];
+        pixels[index * 3] = ((value >> 8) & 0xf) * 0x11;
+        pixels[index * 3 + 1] = ((value >> 4) & 0xf) * 0x11;
+        pixels[index * 3 + 2] = (value & 0xf) * 0x11;
+    }
+    else {
+        pixels[index] = color;
+    }
+}
+
+unsigned short render_lem(Emulator *emulator, unsigned char *pixels,
+    unsigned int rgb) {
+    unsigned short palette[16];
+    unsigned short address = emulator->lem_screen;
+    unsigned int show_blink = (CYCLE / BLINK_RATE) % 2;
+    if (!address) {
+        unsigned int size = LEM_WIDTH * LEM_HEIGHT * (rgb ? 3 : 1);
+        for (unsigned int i = 0; i < size; i++) {
+            pixels[i] = 0;
+        }
+        return 0;
+    }
+    for (unsigned int i = 0; i < 16; i++) {
+        palette[i] = palette_word(emulator, i);
+    }
+    for (unsigned int j = 0; j < LEM_ROWS; j++) {
+        for (unsigned int i = 0; i < LEM_COLUMNS; i++) {
+            unsigned short value = RAM(address);
+            unsigned char character = value & 0x7f;
+            unsigned char back = (value >> 8) & 0x0f;
+            unsigned char fore = (value >> 12) & 0x0f;
+            unsigned int bitmap =
+                (unsigned int)font_word(emulator, character * 2) << 16 |
+                font_word(emulator, character * 2 + 1);
+            if ((value & 0x80) && !show_blink) {
+                fore = back;
+            }
+            for (unsigned int x = 0; x < 4; x++) {
+                for (unsigned int y = 0; y < 8; y++) {
+                    unsigned int bit = (3 - x) * 8 + y;
+                    unsigned int index =
+                        (j * 8 + y) * LEM_WIDTH + i * 4 + x;
+                    put_pixel(pixels, index, palette,
+                        (bitmap >> bit) & 1 ? fore : back, rgb);
+                }
+            }
+            address++;
+        }
+    }
+    return palette[emulator->lem_border & 0xf];
+}
+
 void on_lem(Emulator *emulator) {
     unsigned short address;
     switch (REG(0)) {
@@ -62,14 +132,14 @@ void on_lem(Emulator *emulator) {
         case 4: // DUMP_FONT
             address = REG(1);
             for (unsigned int i = 0; i < 256; i++) {
-                RAM(address++) = LEM_FONT[i];
+                STORE(address++, LEM_FONT[i]);
             }
             CYCLES(256);
             break;
         case 5: // DUMP_PALETTE
             address = REG(1);
             for (unsigned int i = 0; i < 16; i++) {
-                RAM(address++) = LEM_PALETTE[i];
+                STORE(address++, LEM_PALETTE[i]);
             }
             CYCLES(16);
             break;
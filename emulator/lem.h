@@ -5,4 +5,7 @@
 
 void on_lem(Emulator *emulator);
 
+unsigned short render_lem(Emulator *emulator, unsigned char *pixels,
+    unsigned int rgb);
+
 #endif
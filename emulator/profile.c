@@ -0,0 +1,43 @@
+#include <stdlib.h>
+#include "common.h"
+#include "emulator.h"
+#include "profile.h"
+
+// Profile Functions
+int enable_profile(Emulator *emulator) {
+    if (emulator->profile_cycles) {
+        return 1;
+    }
+    emulator->profile_cycles = calloc(SIZE, sizeof(unsigned long long int));
+    emulator->profile_counts = calloc(SIZE, sizeof(unsigned int));
+    if (!emulator->profile_cycles || !emulator->profile_counts) {
+        disable_profile(emulator);
+        return 0;
+    }
+    emulator->hooks |= HOOK_PROFILE;
+    return 1;
+}
+
+void disable_profile(Emulator *emulator) {
+    free(emulator->profile_cycles);
+    free(emulator->profile_counts);
+    emulator->profile_cycles = 0;
+    emulator->profile_counts = 0;
+    emulator->hooks &= ~HOOK_PROFILE;
+}
+
+void clear_profile(Emulator *emulator) {
+    if (!emulator->profile_cycles) {
+        return;
+    }
+    for (unsigned int i = 0; i < SIZE; i++) {
+        emulator->profile_cycles[i] = 0;
+        emulator->profile_counts[i] = 0;
+    }
+}
+
+void profile_instruction(Emulator *emulator, unsigned short pc,
+    unsigned long long int cycles) {
+    emulator->profile_cycles[pc] += cycles;
+    emulator->profile_counts[pc]++;
+}
@@ -0,0 +1,15 @@
+#ifndef PROFILE_H
+#define PROFILE_H
+
+#include "emulator.h"
+
+int enable_profile(Emulator *emulator);
+
+void disable_profile(Emulator *emulator);
+
+void clear_profile(Emulator *emulator);
+
+void profile_instruction(Emulator *emulator, unsigned short pc,
+    unsigned long long int cycles);
+
+#endif
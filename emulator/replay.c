@@ -0,0 +1,60 @@
+#include <stdlib.h>
+#include <string.h>
+#include "common.h"
+#include "emulator.h"
+#include "keyboard.h"
+#include "replay.h"
+
+// Replay Functions
+int start_replay(Emulator *emulator, InputRecord *records,
+    unsigned int count) {
+    stop_replay(emulator);
+    if (!count) {
+        return 1;
+    }
+    emulator->replay = malloc(sizeof(InputRecord) * count);
+    if (!emulator->replay) {
+        return 0;
+    }
+    memcpy(emulator->replay, records, sizeof(InputRecord) * count);
+    emulator->replay_count = count;
+    emulator->replay_next = 0;
+    // Input recorded before the first run applies before the first step
+    if (records[0].cycle <= CYCLE) {
+        on_replay(emulator);
+    }
+    else {
+        schedule(emulator, EVENT_REPLAY, records[0].cycle);
+    }
+    return 1;
+}
+
+void stop_replay(Emulator *emulator) {
+    free(emulator->replay);
+    emulator->replay = 0;
+    emulator->replay_count = 0;
+    emulator->replay_next = 0;
+    emulator->events[EVENT_REPLAY] = NO_EVENT;
+}
+
+void on_replay(Emulator *emulator) {
+    while (emulator->replay_next < emulator->replay_count) {
+        InputRecord *record = emulator->replay + emulator->replay_next;
+        if (record->cycle > CYCLE) {
+            schedule(emulator, EVENT_REPLAY, record->cycle);
+            return;
+        }
+        switch (record->type) {
+            case INPUT_KEY_DOWN:
+                on_key_down(emulator, record->key);
+                break;
+            case INPUT_KEY_UP:
+                on_key_up(emulator, record->key);
+                break;
+            case INPUT_CHAR:
+                on_char(emulator, record->key);
+                break;
+        }
+        emulator->replay_next++;
+    }
+}
@@ -0,0 +1,13 @@
+#ifndef REPLAY_H
+#define REPLAY_H
+
+#include "emulator.h"
+
+int start_replay(Emulator *emulator, InputRecord *records,
+    unsigned int count);
+
+void stop_replay(Emulator *emulator);
+
+void on_replay(Emulator *emulator);
+
+#endif
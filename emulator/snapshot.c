@@ -0,0 +1,164 @@
+#include <stddef.h>
+#include <stdlib.h>
+#include <string.h>
+#include "common.h"
+#include "emulator.h"
+#include "snapshot.h"
+
+#define STATE_OFFSET offsetof(Emulator, skip)
+#define STATE_SIZE (offsetof(Emulator, engine) - STATE_OFFSET)
+#define ALIGN(x) (((x) + 7) & ~7u)
+
+// Pages
+static Page *retain_page(Page *page) {
+    page->references++;
+    return page;
+}
+
+static void release_page(Page *page) {
+    if (page && !--page->references) {
+        free(page);
+    }
+}
+
+static Page *copy_page(Emulator *emulator, unsigned int index) {
+    Page *page = malloc(sizeof(Page));
+    if (page) {
+        memcpy(page->ram, emulator->ram + index * PAGE_SIZE,
+            sizeof(page->ram));
+        page->references = 1;
+    }
+    return page;
+}
+
+static int has_pages(Emulator *emulator) {
+    if (!emulator->pages) {
+        emulator->pages = calloc(N_PAGES, sizeof(Page *));
+    }
+    return emulator->pages != 0;
+}
+
+void release_pages(Emulator *emulator) {
+    if (!emulator->pages) {
+        return;
+    }
+    for (unsigned int i = 0; i < N_PAGES; i++) {
+        release_page(emulator->pages[i]);
+    }
+    free(emulator->pages);
+    emulator->pages = 0;
+}
+
+// Devices
+static unsigned int save_devices(Emulator *emulator, Snapshot *snapshot) {
+    unsigned int size = ALIGN(STATE_SIZE);
+    for (unsigned int i = 0; i < MAX_DEVICES; i++) {
+        Device *device = emulator->devices + i;
+        if (snapshot) {
+            snapshot->devices[i] = i < emulator->n_devices ?
+                device->state : 0;
+        }
+        if (i >= emulator->n_devices || !device->on_save) {
+            continue;
+        }
+        if (snapshot) {
+            snapshot->offsets[i] = size;
+            device->on_save(emulator, device->state,
+                snapshot->state + size);
+        }
+        size += ALIGN(device->save_size);
+    }
+    return size;
+}
+
+static void restore_devices(Emulator *emulator, Snapshot *snapshot) {
+    for (unsigned int i = N_BUILTIN_DEVICES; i < MAX_DEVICES; i++) {
+        Device *device = emulator->devices + i;
+        if (i < emulator->n_devices && device->state == snapshot->devices[i]) {
+            if (device->on_restore) {
+                device->on_restore(emulator, device->state,
+                    snapshot->state + snapshot->offsets[i]);
+            }
+            continue;
+        }
+        // Attached or detached since the snapshot
+        emulator->events[i] = NO_EVENT;
+        if (i >= emulator->n_devices) {
+            continue;
+        }
+        if (device->on_reset) {
+            device->on_reset(emulator, device->state);
+        }
+    }
+    emulator->replay_next = snapshot->replay_next;
+    if (emulator->replay_next > emulator->replay_count) {
+        emulator->replay_next = emulator->replay_count;
+    }
+}
+
+// Snapshot Functions
+Snapshot *snapshot(Emulator *emulator) {
+    Snapshot *snapshot;
+    if (!has_pages(emulator)) {
+        return 0;
+    }
+    snapshot = malloc(sizeof(Snapshot) + save_devices(emulator, 0));
+    if (!snapshot) {
+        return 0;
+    }
+    for (unsigned int i = 0; i < N_PAGES; i++) {
+        Page *page = emulator->pages[i];
+        if (!page || (emulator->dirty[i] & DIRTY_SNAPSHOT)) {
+            page = copy_page(emulator, i);
+            if (!page) {
+                while (i--) {
+                    release_page(snapshot->pages[i]);
+                }
+                free(snapshot);
+                return 0;
+            }
+            release_page(emulator->pages[i]);
+            emulator->pages[i] = page;
+            emulator->dirty[i] &= ~DIRTY_SNAPSHOT;
+        }
+        snapshot->pages[i] = retain_page(page);
+    }
+    memcpy(snapshot->registers, emulator->ram + SIZE,
+        sizeof(snapshot->registers));
+    memcpy(snapshot->state, (char *)emulator + STATE_OFFSET, STATE_SIZE);
+    save_devices(emulator, snapshot);
+    snapshot->replay_next = emulator->replay_next;
+    return snapshot;
+}
+
+void restore(Emulator *emulator, Snapshot *snapshot) {
+    if (!has_pages(emulator)) {
+        return;
+    }
+    for (unsigned int i = 0; i < N_PAGES; i++) {
+        Page *page = snapshot->pages[i];
+        if (page == emulator->pages[i] &&
+            !(emulator->dirty[i] & DIRTY_SNAPSHOT)) {
+            continue;
+        }
+        memcpy(emulator->ram + i * PAGE_SIZE, page->ram, sizeof(page->ram));
+        invalidate(emulator, i * PAGE_SIZE, PAGE_SIZE);
+        release_page(emulator->pages[i]);
+        emulator->pages[i] = retain_page(page);
+        emulator->dirty[i] &= ~DIRTY_SNAPSHOT;
+    }
+    memcpy(emulator->ram + SIZE, snapshot->registers,
+        sizeof(snapshot->registers));
+    memcpy((char *)emulator + STATE_OFFSET, snapshot->state, STATE_SIZE);
+    restore_devices(emulator, snapshot);
+}
+
+void release(Snapshot *snapshot) {
+    if (!snapshot) {
+        return;
+    }
+    for (unsigned int i = 0; i < N_PAGES; i++) {
+        release_page(snapshot->pages[i]);
+    }
+    free(snapshot);
+}
@@ -0,0 +1,24 @@
+#ifndef SNAPSHOT_H
+#define SNAPSHOT_H
+
+#include "emulator.h"
+
+// Snapshot
+typedef struct {
+    Page *pages[N_PAGES];
+    unsigned short registers[EXT_SIZE - SIZE];
+    void *devices[MAX_DEVICES];
+    unsigned int offsets[MAX_DEVICES];
+    unsigned int replay_next;
+    unsigned char state[];
+} Snapshot;
+
+Snapshot *snapshot(Emulator *emulator);
+
+void restore(Emulator *emulator, Snapshot *snapshot);
+
+void release(Snapshot *snapshot);
+
+void release_pages(Emulator *emulator);
+
+#endif
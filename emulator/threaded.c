@@ -0,0 +1,332 @@
+#include "common.h"
+#include "emulator.h"
+#include "decoder.h"
+#include "threaded.h"
+#include "idle.h"
+
+// Dispatch
+#ifdef __GNUC__
+#define HANDLER(name) name:
+#define DISPATCH() \
+    d = fetch(emulator); \
+    PC += d->size; \
+    goto *HANDLERS[d->handler]
+#else
+#define HANDLER(name) case name:
+#define DISPATCH() \
+    d = fetch(emulator); \
+    PC += d->size; \
+    goto dispatch
+#endif
+
+#define NEXT() \
+    if (SKIP) { \
+        skip(emulator); \
+    } \
+    if (CYCLE >= emulator->event_cycle) { \
+        do_events(emulator); \
+        if (HALT) { \
+            return; \
+        } \
+    } \
+    if (CYCLE >= limit || !--steps) { \
+        return; \
+    } \
+    DISPATCH()
+
+#define BASIC() \
+    src = value(emulator, d->src, d->src_word); \
+    dst = address(emulator, d->dst, d->dst_word); \
+    ram = RAM(dst); \
+    ssrc = (short)(unsigned short)src; \
+    sram = (short)(unsigned short)ram
+
+#define SPECIAL() \
+    dst = address(emulator, d->src, d->src_word); \
+    ram = RAM(dst)
+
+void threaded_run(Emulator *emulator, unsigned long long int limit,
+    unsigned int steps) {
+#ifdef __GNUC__
+    static void *HANDLERS[N_HANDLERS] = {
+        [H_NOP] = &&H_NOP, [H_SET] = &&H_SET, [H_ADD] = &&H_ADD,
+        [H_SUB] = &&H_SUB, [H_MUL] = &&H_MUL, [H_MLI] = &&H_MLI,
+        [H_DIV] = &&H_DIV, [H_DVI] = &&H_DVI, [H_MOD] = &&H_MOD,
+        [H_MDI] = &&H_MDI, [H_AND] = &&H_AND, [H_BOR] = &&H_BOR,
+        [H_XOR] = &&H_XOR, [H_SHR] = &&H_SHR, [H_ASR] = &&H_ASR,
+        [H_SHL] = &&H_SHL, [H_IFB] = &&H_IFB, [H_IFC] = &&H_IFC,
+        [H_IFE] = &&H_IFE, [H_IFN] = &&H_IFN, [H_IFG] = &&H_IFG,
+        [H_IFA] = &&H_IFA, [H_IFL] = &&H_IFL, [H_IFU] = &&H_IFU,
+        [H_ADX] = &&H_ADX, [H_SUX] = &&H_SUX, [H_STI] = &&H_STI,
+        [H_STD] = &&H_STD, [H_SPECIAL_NOP] = &&H_SPECIAL_NOP,
+        [H_JSR] = &&H_JSR, [H_BRK] = &&H_BRK, [H_INT] = &&H_INT,
+        [H_IAG] = &&H_IAG, [H_IAS] = &&H_IAS, [H_RFI] = &&H_RFI,
+        [H_IAQ] = &&H_IAQ, [H_HWN] = &&H_HWN, [H_HWQ] = &&H_HWQ,
+        [H_HWI] = &&H_HWI, [H_BACK] = &&H_BACK,
+    };
+#endif
+    Decoded *d;
+    int src, dst, ram, quo, mod;
+    short ssrc, sram;
+    if (CYCLE >= limit || !steps) {
+        return;
+    }
+    if (HALT) {
+        WAKE();
+    }
+    DISPATCH();
+#ifndef __GNUC__
+dispatch:
+    switch (d->handler) {
+#endif
+    HANDLER(H_NOP)
+        BASIC();
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_SET)
+        BASIC();
+        UNCHECKED_STORE(dst, src);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_ADD)
+        BASIC();
+        mod = divmod(ram + src, &quo);
+        EX = quo ? 1 : 0;
+        UNCHECKED_STORE(dst, mod);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_SUB)
+        BASIC();
+        mod = divmod(ram - src, &quo);
+        EX = quo ? MAX_VALUE : 0;
+        UNCHECKED_STORE(dst, mod);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_MUL)
+        BASIC();
+        mod = divmod(ram * src, &quo);
+        EX = quo % SIZE;
+        UNCHECKED_STORE(dst, mod);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_MLI)
+        BASIC();
+        mod = divmod(sram * ssrc, &quo);
+        EX = quo % SIZE;
+        UNCHECKED_STORE(dst, mod);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_DIV)
+        BASIC();
+        if (src) {
+            EX = ((ram << 16) / src) % SIZE;
+            UNCHECKED_STORE(dst, (ram / src) % SIZE);
+        }
+        else {
+            EX = 0;
+            UNCHECKED_STORE(dst, 0);
+        }
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_DVI)
+        BASIC();
+        if (src) {
+            EX = ((sram << 16) / ssrc) % SIZE;
+            UNCHECKED_STORE(dst, (sram / ssrc) % SIZE);
+        }
+        else {
+            EX = 0;
+            UNCHECKED_STORE(dst, 0);
+        }
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_MOD)
+        BASIC();
+        UNCHECKED_STORE(dst, src ? (ram % src) % SIZE : 0);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_MDI)
+        BASIC();
+        UNCHECKED_STORE(dst, src ? (sram % ssrc) % SIZE : 0);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_AND)
+        BASIC();
+        UNCHECKED_STORE(dst, (ram & src) % SIZE);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_BOR)
+        BASIC();
+        UNCHECKED_STORE(dst, (ram | src) % SIZE);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_XOR)
+        BASIC();
+        UNCHECKED_STORE(dst, (ram ^ src) % SIZE);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_SHR)
+        BASIC();
+        EX = ((ram << 16) >> src) % SIZE;
+        UNCHECKED_STORE(dst, (ram >> src) % SIZE);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_ASR)
+        BASIC();
+        EX = ((sram << 16) >> src) % SIZE;
+        UNCHECKED_STORE(dst, (sram >> src) % SIZE);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_SHL)
+        BASIC();
+        EX = ((ram << src) >> 16) % SIZE;
+        UNCHECKED_STORE(dst, (ram << src) % SIZE);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_IFB)
+        BASIC();
+        SKIP = (ram & src) != 0 ? 0 : 1;
+        CYCLES(d->cycles + SKIP);
+        NEXT();
+    HANDLER(H_IFC)
+        BASIC();
+        SKIP = (ram & src) == 0 ? 0 : 1;
+        CYCLES(d->cycles + SKIP);
+        NEXT();
+    HANDLER(H_IFE)
+        BASIC();
+        SKIP = (ram == src) ? 0 : 1;
+        CYCLES(d->cycles + SKIP);
+        NEXT();
+    HANDLER(H_IFN)
+        BASIC();
+        SKIP = (ram != src) ? 0 : 1;
+        CYCLES(d->cycles + SKIP);
+        NEXT();
+    HANDLER(H_IFG)
+        BASIC();
+        SKIP = (ram > src) ? 0 : 1;
+        CYCLES(d->cycles + SKIP);
+        NEXT();
+    HANDLER(H_IFA)
+        BASIC();
+        SKIP = (sram > ssrc) ? 0 : 1;
+        CYCLES(d->cycles + SKIP);
+        NEXT();
+    HANDLER(H_IFL)
+        BASIC();
+        SKIP = (ram < src) ? 0 : 1;
+        CYCLES(d->cycles + SKIP);
+        NEXT();
+    HANDLER(H_IFU)
+        BASIC();
+        SKIP = (sram < ssrc) ? 0 : 1;
+        CYCLES(d->cycles + SKIP);
+        NEXT();
+    HANDLER(H_ADX)
+        BASIC();
+        mod = divmod(ram + src + EX, &quo);
+        EX = quo ? 1 : 0;
+        UNCHECKED_STORE(dst, mod);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_SUX)
+        BASIC();
+        mod = divmod(ram - src + EX, &quo);
+        EX = quo ? MAX_VALUE : 0;
+        UNCHECKED_STORE(dst, mod);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_STI)
+        BASIC();
+        UNCHECKED_STORE(dst, src);
+        REG(6)++;
+        REG(7)++;
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_STD)
+        BASIC();
+        UNCHECKED_STORE(dst, src);
+        REG(6)--;
+        REG(7)--;
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_SPECIAL_NOP)
+        SPECIAL();
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_JSR)
+        SPECIAL();
+        UNCHECKED_STORE(--SP, PC);
+        PC = ram;
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_BRK)
+        SPECIAL();
+        HALT = 1;
+        WAKE();
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_INT)
+        SPECIAL();
+        interrupt(emulator, ram);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_IAG)
+        SPECIAL();
+        UNCHECKED_STORE(dst, IA);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_IAS)
+        SPECIAL();
+        IA = ram;
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_RFI)
+        SPECIAL();
+        emulator->interrupt_queueing = 0;
+        WAKE();
+        REG(0) = RAM(SP++);
+        PC = RAM(SP++);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_IAQ)
+        SPECIAL();
+        emulator->interrupt_queueing = ram;
+        WAKE();
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_HWN)
+        SPECIAL();
+        UNCHECKED_STORE(dst, emulator->n_devices);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_HWQ)
+        SPECIAL();
+        on_hwq(emulator, ram);
+        CYCLES(d->cycles);
+        NEXT();
+    HANDLER(H_HWI)
+        SPECIAL();
+        CYCLES(d->cycles - 4);
+        on_hwi(emulator, ram);
+        CYCLES(4);
+        NEXT();
+    HANDLER(H_BACK)
+        PC = d->src_word;
+        CYCLES(d->cycles);
+        fast_forward(emulator, limit, &steps);
+        NEXT();
+#ifndef __GNUC__
+    }
+#endif
+}
+
+// Threaded Functions
+void threaded_n_steps(Emulator *emulator, unsigned int steps) {
+    threaded_run(emulator, ~0ULL, steps);
+}
+
+void threaded_n_cycles(Emulator *emulator, unsigned int cycles) {
+    threaded_run(emulator, CYCLE + cycles, cycles);
+}
@@ -0,0 +1,13 @@
+#ifndef THREADED_H
+#define THREADED_H
+
+#include "emulator.h"
+
+void threaded_run(Emulator *emulator, unsigned long long int limit,
+    unsigned int steps);
+
+void threaded_n_steps(Emulator *emulator, unsigned int steps);
+
+void threaded_n_cycles(Emulator *emulator, unsigned int cycles);
+
+#endif
@@ -0,0 +1,50 @@
+#include <stdlib.h>
+#include "common.h"
+#include "emulator.h"
+#include "trace.h"
+
+// Trace Functions
+int enable_trace(Emulator *emulator, unsigned int capacity) {
+    TraceRecord *trace;
+    if (!capacity) {
+        return 0;
+    }
+    trace = calloc(capacity, sizeof(TraceRecord));
+    if (!trace) {
+        return 0;
+    }
+    disable_trace(emulator);
+    emulator->trace = trace;
+    emulator->trace_capacity = capacity;
+    emulator->hooks |= HOOK_TRACE;
+    return 1;
+}
+
+void disable_trace(Emulator *emulator) {
+    free(emulator->trace);
+    emulator->trace = 0;
+    emulator->trace_record = 0;
+    emulator->trace_capacity = 0;
+    emulator->hooks &= ~HOOK_TRACE;
+    clear_trace(emulator);
+}
+
+void clear_trace(Emulator *emulator) {
+    emulator->trace_head = 0;
+    emulator->trace_count = 0;
+}
+
+void trace_instruction(Emulator *emulator) {
+    TraceRecord *record = emulator->trace + emulator->trace_head;
+    record->cycle = CYCLE;
+    record->dst = NO_DST;
+    record->pc = PC;
+    record->word = RAM(PC);
+    record->value = 0;
+    emulator->trace_head = (emulator->trace_head + 1) %
+        emulator->trace_capacity;
+    if (emulator->trace_count < emulator->trace_capacity) {
+        emulator->trace_count++;
+    }
+    emulator->trace_record = record;
+}
@@ -0,0 +1,14 @@
+#ifndef TRACE_H
+#define TRACE_H
+
+#include "emulator.h"
+
+int enable_trace(Emulator *emulator, unsigned int capacity);
+
+void disable_trace(Emulator *emulator);
+
+void clear_trace(Emulator *emulator);
+
+void trace_instruction(Emulator *emulator);
+
+#endif
@@ -0,0 +1,401 @@
+#include "common.h"
+#include "emulator.h"
+#include "decoder.h"
+#include "threaded.h"
+#include "translated.h"
+#include "idle.h"
+
+// Translation
+static unsigned short *static_value(Emulator *emulator, Operation *o) {
+    switch (o->src) {
+        case 0x00: case 0x01: case 0x02: case 0x03:
+        case 0x04: case 0x05: case 0x06: case 0x07:
+            return &REG(o->src);
+        case 0x1b:
+            return &SP;
+        case 0x1c:
+            o->literal = (o->next - o->src_word) & MAX_VALUE;
+            return &o->literal;
+        case 0x1d:
+            return &EX;
+        case 0x1e:
+            return &RAM(o->src_word);
+        case 0x1f:
+            o->literal = o->src_word;
+            return &o->literal;
+        default:
+            return 0;
+    }
+}
+
+static int static_address(Operation *o) {
+    switch (o->dst) {
+        case 0x00: case 0x01: case 0x02: case 0x03:
+        case 0x04: case 0x05: case 0x06: case 0x07:
+            return REG_ADDR + o->dst;
+        case 0x1b:
+            return SP_ADDR;
+        case 0x1c:
+            return PC_ADDR;
+        case 0x1d:
+            return EX_ADDR;
+        case 0x1e:
+            return o->dst_word;
+        default:
+            return -1;
+    }
+}
+
+static Block *translate(Emulator *emulator, unsigned short address) {
+    Translation *translation = emulator->translation;
+    Block *block;
+    unsigned short next = address;
+    unsigned char conditional = 0;
+    if (translation->n_blocks == MAX_BLOCKS ||
+        translation->n_operations + MAX_BLOCK_LENGTH > MAX_OPERATIONS) {
+        translation->flushed = 1;
+        return 0;
+    }
+    block = translation->blocks + translation->n_blocks++;
+    block->operations = translation->operations + translation->n_operations;
+    block->address = address;
+    block->length = 0;
+    block->cycles = 0;
+    while (block->length < MAX_BLOCK_LENGTH) {
+        Decoded *d = emulator->decoded + next;
+        Operation *o;
+        if (!d->valid) {
+            d = decode(emulator, next);
+        }
+        if (d->handler >= H_SPECIAL_NOP && d->handler != H_JSR) {
+            break;
+        }
+        o = block->operations + block->length++;
+        o->handler = d->handler;
+        o->cycles = d->cycles;
+        o->dst = d->dst;
+        o->src = d->src;
+        o->dst_word = d->dst_word;
+        o->src_word = d->src_word;
+        o->next = next + d->size;
+        o->value = static_value(emulator, o);
+        o->address = static_address(o);
+        if (!o->value || o->address < 0) {
+            o->handler += N_HANDLERS;
+        }
+        block->cycles += d->cycles;
+        for (unsigned int i = 0; i < d->size; i++) {
+            translation->code[next++] = 1;
+        }
+        // Conditional jumps exit from the middle of the block
+        if (d->dst == 0x1c && conditional && !IS_CONDITIONAL(d->handler)) {
+            if (o->handler < N_HANDLERS) {
+                o->handler += N_HANDLERS;
+            }
+        }
+        else if (d->dst == 0x1c || d->handler == H_JSR) {
+            break;
+        }
+        conditional = IS_CONDITIONAL(d->handler);
+    }
+    block->end = next;
+    translation->n_operations += block->length;
+    translation->entries[address] = block;
+    return block;
+}
+
+static void flush(Translation *translation) {
+    for (unsigned int i = 0; i < translation->n_blocks; i++) {
+        Block *block = translation->blocks + i;
+        translation->entries[block->address] = 0;
+        translation->counts[block->address] = 0;
+        for (unsigned short a = block->address; a != block->end; a++) {
+            translation->code[a] = 0;
+        }
+    }
+    translation->n_blocks = 0;
+    translation->n_operations = 0;
+    translation->flushed = 0;
+}
+
+// Dispatch
+#ifdef __GNUC__
+#define HANDLER(name) name:
+#define GENERIC_HANDLER(name) name##_GENERIC:
+#define ENTRY(name) [name] = &&name, [name + N_HANDLERS] = &&name##_GENERIC
+#define DISPATCH() goto *HANDLERS[o->handler]
+#else
+#define HANDLER(name) case name:
+#define GENERIC_HANDLER(name) case name + N_HANDLERS:
+#define DISPATCH() goto dispatch
+#endif
+
+#define NEXT() \
+    if (o == last || translation->flushed) { \
+        goto done; \
+    } \
+    o++; \
+    DISPATCH()
+
+// Failed conditions skip the following operations inside the block
+#define CONDITION(condition) \
+    SKIP = (condition) ? 0 : 1; \
+    CYCLES(SKIP); \
+    while (SKIP && o != last) { \
+        o++; \
+        skipped++; \
+        skipped_cycles += o->cycles; \
+        if (IS_CONDITIONAL(o->handler % N_HANDLERS)) { \
+            CYCLES(1); \
+        } \
+        else { \
+            SKIP = 0; \
+        } \
+    }
+
+#define STATIC() \
+    src = *o->value; \
+    dst = o->address; \
+    ram = RAM(dst); \
+    ssrc = (short)(unsigned short)src; \
+    sram = (short)(unsigned short)ram
+
+#define GENERIC() \
+    src = o->value ? *o->value : value(emulator, o->src, o->src_word); \
+    dst = o->address >= 0 ? o->address : \
+        address(emulator, o->dst, o->dst_word); \
+    ram = RAM(dst); \
+    ssrc = (short)(unsigned short)src; \
+    sram = (short)(unsigned short)ram
+
+#define OPERATION(name, ...) \
+    HANDLER(name) \
+        STATIC(); \
+        __VA_ARGS__ \
+        NEXT(); \
+    GENERIC_HANDLER(name) \
+        if (o->dst == 0x1c) { \
+            PC = o->next; \
+        } \
+        GENERIC(); \
+        __VA_ARGS__ \
+        if (o->dst == 0x1c) { \
+            goto jumped; \
+        } \
+        NEXT();
+
+#define CONDITIONAL_OPERATION(name, condition) \
+    HANDLER(name) \
+        STATIC(); \
+        CONDITION(condition); \
+        NEXT(); \
+    GENERIC_HANDLER(name) \
+        GENERIC(); \
+        CONDITION(condition); \
+        NEXT();
+
+static unsigned int execute_block(Emulator *emulator, Block *block) {
+#ifdef __GNUC__
+    static void *HANDLERS[N_HANDLERS * 2] = {
+        ENTRY(H_NOP), ENTRY(H_SET), ENTRY(H_ADD), ENTRY(H_SUB),
+        ENTRY(H_MUL), ENTRY(H_MLI), ENTRY(H_DIV), ENTRY(H_DVI),
+        ENTRY(H_MOD), ENTRY(H_MDI), ENTRY(H_AND), ENTRY(H_BOR),
+        ENTRY(H_XOR), ENTRY(H_SHR), ENTRY(H_ASR), ENTRY(H_SHL),
+        ENTRY(H_IFB), ENTRY(H_IFC), ENTRY(H_IFE), ENTRY(H_IFN),
+        ENTRY(H_IFG), ENTRY(H_IFA), ENTRY(H_IFL), ENTRY(H_IFU),
+        ENTRY(H_ADX), ENTRY(H_SUX), ENTRY(H_STI), ENTRY(H_STD),
+        ENTRY(H_JSR),
+    };
+#endif
+    Translation *translation = emulator->translation;
+    Operation *o = block->operations;
+    Operation *last = o + block->length - 1;
+    unsigned int skipped = 0, skipped_cycles = 0;
+    int src, dst, ram, quo, mod;
+    short ssrc, sram;
+    PC = last->next;
+    DISPATCH();
+#ifndef __GNUC__
+dispatch:
+    switch (o->handler) {
+#endif
+    OPERATION(H_NOP, )
+    OPERATION(H_SET,
+        UNCHECKED_STORE(dst, src);
+    )
+    OPERATION(H_ADD,
+        mod = divmod(ram + src, &quo);
+        EX = quo ? 1 : 0;
+        UNCHECKED_STORE(dst, mod);
+    )
+    OPERATION(H_SUB,
+        mod = divmod(ram - src, &quo);
+        EX = quo ? MAX_VALUE : 0;
+        UNCHECKED_STORE(dst, mod);
+    )
+    OPERATION(H_MUL,
+        mod = divmod(ram * src, &quo);
+        EX = quo % SIZE;
+        UNCHECKED_STORE(dst, mod);
+    )
+    OPERATION(H_MLI,
+        mod = divmod(sram * ssrc, &quo);
+        EX = quo % SIZE;
+        UNCHECKED_STORE(dst, mod);
+    )
+    OPERATION(H_DIV,
+        if (src) {
+            EX = ((ram << 16) / src) % SIZE;
+            UNCHECKED_STORE(dst, (ram / src) % SIZE);
+        }
+        else {
+            EX = 0;
+            UNCHECKED_STORE(dst, 0);
+        }
+    )
+    OPERATION(H_DVI,
+        if (src) {
+            EX = ((sram << 16) / ssrc) % SIZE;
+            UNCHECKED_STORE(dst, (sram / ssrc) % SIZE);
+        }
+        else {
+            EX = 0;
+            UNCHECKED_STORE(dst, 0);
+        }
+    )
+    OPERATION(H_MOD,
+        UNCHECKED_STORE(dst, src ? (ram % src) % SIZE : 0);
+    )
+    OPERATION(H_MDI,
+        UNCHECKED_STORE(dst, src ? (sram % ssrc) % SIZE : 0);
+    )
+    OPERATION(H_AND,
+        UNCHECKED_STORE(dst, (ram & src) % SIZE);
+    )
+    OPERATION(H_BOR,
+        UNCHECKED_STORE(dst, (ram | src) % SIZE);
+    )
+    OPERATION(H_XOR,
+        UNCHECKED_STORE(dst, (ram ^ src) % SIZE);
+    )
+    OPERATION(H_SHR,
+        EX = ((ram << 16) >> src) % SIZE;
+        UNCHECKED_STORE(dst, (ram >> src) % SIZE);
+    )
+    OPERATION(H_ASR,
+        EX = ((sram << 16) >> src) % SIZE;
+        UNCHECKED_STORE(dst, (sram >> src) % SIZE);
+    )
+    OPERATION(H_SHL,
+        EX = ((ram << src) >> 16) % SIZE;
+        UNCHECKED_STORE(dst, (ram << src) % SIZE);
+    )
+    CONDITIONAL_OPERATION(H_IFB, (ram & src) != 0)
+    CONDITIONAL_OPERATION(H_IFC, (ram & src) == 0)
+    CONDITIONAL_OPERATION(H_IFE, ram == src)
+    CONDITIONAL_OPERATION(H_IFN, ram != src)
+    CONDITIONAL_OPERATION(H_IFG, ram > src)
+    CONDITIONAL_OPERATION(H_IFA, sram > ssrc)
+    CONDITIONAL_OPERATION(H_IFL, ram < src)
+    CONDITIONAL_OPERATION(H_IFU, sram < ssrc)
+    OPERATION(H_ADX,
+        mod = divmod(ram + src + EX, &quo);
+        EX = quo ? 1 : 0;
+        UNCHECKED_STORE(dst, mod);
+    )
+    OPERATION(H_SUX,
+        mod = divmod(ram - src + EX, &quo);
+        EX = quo ? MAX_VALUE : 0;
+        UNCHECKED_STORE(dst, mod);
+    )
+    OPERATION(H_STI,
+        UNCHECKED_STORE(dst, src);
+        REG(6)++;
+        REG(7)++;
+    )
+    OPERATION(H_STD,
+        UNCHECKED_STORE(dst, src);
+        REG(6)--;
+        REG(7)--;
+    )
+    OPERATION(H_JSR,
+        UNCHECKED_STORE(--SP, PC);
+        PC = src;
+    )
+#ifndef __GNUC__
+    }
+#endif
+done:
+    if (o == last) {
+        CYCLES(block->cycles - skipped_cycles);
+        return block->length - skipped;
+    }
+    PC = o->next;
+jumped:
+    for (Operation *p = block->operations; p <= o; p++) {
+        CYCLES(p->cycles);
+    }
+    CYCLE -= skipped_cycles;
+    return o - block->operations + 1 - skipped;
+}
+
+static void run(Emulator *emulator, unsigned long long int limit,
+    unsigned int steps) {
+    Translation *translation = emulator->translation;
+    Block *block;
+    if (CYCLE >= limit || !steps) {
+        return;
+    }
+    if (HALT) {
+        threaded_run(emulator, limit, 1);
+        return;
+    }
+    while (1) {
+        if (translation->flushed) {
+            flush(translation);
+        }
+        block = translation->entries[PC];
+        if (!block && ++translation->counts[PC] >= HOT_COUNT) {
+            block = translate(emulator, PC);
+        }
+        if (block && block->length && block->length <= steps &&
+            CYCLE + block->cycles < limit &&
+            CYCLE + block->cycles < emulator->event_cycle) {
+            steps -= execute_block(emulator, block);
+            if (SKIP) {
+                skip(emulator);
+            }
+            if (CYCLE >= emulator->event_cycle) {
+                do_events(emulator);
+                if (HALT) {
+                    return;
+                }
+            }
+            if (CYCLE >= limit || !steps) {
+                return;
+            }
+        }
+        else {
+            Decoded *d = emulator->decoded + PC;
+            threaded_run(emulator, limit, 1);
+            if (d->valid && d->handler == H_BACK) {
+                fast_forward(emulator, limit, &steps);
+                if (CYCLE >= emulator->event_cycle) {
+                    do_events(emulator);
+                }
+            }
+            if (HALT || CYCLE >= limit || !--steps) {
+                return;
+            }
+        }
+    }
+}
+
+// Translated Functions
+void translated_n_steps(Emulator *emulator, unsigned int steps) {
+    run(emulator, ~0ULL, steps);
+}
+
+void translated_n_cycles(Emulator *emulator, unsigned int cycles) {
+    run(emulator, CYCLE + cycles, cycles);
+}
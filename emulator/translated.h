@@ -0,0 +1,10 @@
+#ifndef TRANSLATED_H
+#define TRANSLATED_H
+
+#include "emulator.h"
+
+void translated_n_steps(Emulator *emulator, unsigned int steps);
+
+void translated_n_cycles(Emulator *emulator, unsigned int cycles);
+
+#endif
@@ -1,7 +1,8 @@
-from app import Emulator, Frame
+from app.emulator import Emulator
 import wx
 
 def main():
+    from app.view import Frame
     app = wx.App(None)
     frame = Frame(Emulator())
     frame.Center()
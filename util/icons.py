@@ -22,9 +22,16 @@ def print_data(data):
 
 def generate(folder):
     print '# Automatically generated file!'
-    print 'from wx.lib.embeddedimage import PyEmbeddedImage'
+    print 'DATA = {}'
+    print 'BITMAPS = {}'
     print
-    for name in os.listdir(folder):
+    print 'def get_bitmap(name):'
+    print '    if name not in BITMAPS:'
+    print '        from wx.lib.embeddedimage import PyEmbeddedImage'
+    print '        BITMAPS[name] = PyEmbeddedImage(DATA[name]).GetBitmap()'
+    print '    return BITMAPS[name]'
+    print
+    for name in sorted(os.listdir(folder)):
         if name in IGNORE:
             continue
         if name[-4:] not in EXTENSIONS:
@@ -33,7 +40,7 @@ def generate(folder):
         base = name[:-4]
         with open(path, 'rb') as f:
             encoded = base64.b64encode(f.read())
-            print '%s = PyEmbeddedImage(' % base
+            print 'DATA[%r] = (' % base
             print_data(encoded)
             print ')'
             print